@@ -1,5 +1,5 @@
-import React, { useState, useCallback, useEffect } from 'react';
-import { Client, Pet, Appointment, Page, AppointmentStatus, Product, Service, Sale } from './types';
+import React, { useState, useCallback, useEffect, useRef } from 'react';
+import { Client, Pet, Appointment, Page, AppointmentStatus, Product, Service, Sale, SyncResponse, TableChanges } from './types';
 import { Sidebar } from './components/Sidebar';
 import { Dashboard } from './components/Dashboard';
 import { Clients } from './components/Clients';
@@ -9,6 +9,18 @@ import { PawIcon } from './components/icons';
 
 const API_URL = '/api';
 
+// Applies one table's sync delta: replaces changed rows, drops deleted ones
+// and puts new rows first or last depending on how the list is ordered.
+function applyChanges<T extends { id: number }>(rows: T[], changes: TableChanges<T>, newestFirst = false): T[] {
+  if (!changes.upserted.length && !changes.deleted.length) return rows;
+  const deleted = new Set(changes.deleted);
+  const upserted = new Map(changes.upserted.map(row => [row.id, row]));
+  const merged = rows.filter(row => !deleted.has(row.id)).map(row => upserted.get(row.id) ?? row);
+  const known = new Set(rows.map(row => row.id));
+  const added = changes.upserted.filter(row => !known.has(row.id));
+  return newestFirst ? [...added.reverse(), ...merged] : [...merged, ...added];
+}
+
 function App() {
   const [currentPage, setCurrentPage] = useState<Page>(Page.Dashboard);
   const [isSidebarOpen, setSidebarOpen] = useState(false);
@@ -18,24 +30,48 @@ function App() {
   const [services, setServices] = useState<Service[]>([]);
   const [sales, setSales] = useState<Sale[]>([]);
 
+  const syncVersion = useRef<number | null>(null);
+
+  const fetchAll = useCallback(async (version: number) => {
+    const [clientsRes, appointmentsRes, productsRes, servicesRes, salesRes] = await Promise.all([
+      fetch(`${API_URL}/clients/`),
+      fetch(`${API_URL}/appointments/`),
+      fetch(`${API_URL}/inventory/products`),
+      fetch(`${API_URL}/inventory/services`),
+      fetch(`${API_URL}/inventory/sales`),
+    ]);
+    setClients(await clientsRes.json());
+    setAppointments(await appointmentsRes.json());
+    setProducts(await productsRes.json());
+    setServices(await servicesRes.json());
+    setSales(await salesRes.json());
+    syncVersion.current = version;
+  }, []);
+
+  // Pulls only what changed since the last sync; falls back to reloading the
+  // full lists on first load or when the server can't serve the delta.
   const fetchData = useCallback(async () => {
     try {
-      const [clientsRes, appointmentsRes, productsRes, servicesRes, salesRes] = await Promise.all([
-        fetch(`${API_URL}/clients/`),
-        fetch(`${API_URL}/appointments/`),
-        fetch(`${API_URL}/inventory/products`),
-        fetch(`${API_URL}/inventory/services`),
-        fetch(`${API_URL}/inventory/sales`),
-      ]);
-      setClients(await clientsRes.json());
-      setAppointments(await appointmentsRes.json());
-      setProducts(await productsRes.json());
-      setServices(await servicesRes.json());
-      setSales(await salesRes.json());
+      let more = true;
+      while (more) {
+        const since = syncVersion.current === null ? '' : `?since=${syncVersion.current}`;
+        const sync: SyncResponse = await (await fetch(`${API_URL}/sync${since}`)).json();
+        if (sync.reset) {
+          await fetchAll(sync.version);
+          return;
+        }
+        setClients(prev => applyChanges(prev, sync.clients));
+        setAppointments(prev => applyChanges(prev, sync.appointments));
+        setProducts(prev => applyChanges(prev, sync.products));
+        setServices(prev => applyChanges(prev, sync.services));
+        setSales(prev => applyChanges(prev, sync.sales, true));
+        syncVersion.current = sync.version;
+        more = sync.more;
+      }
     } catch (error) {
       console.error("Failed to fetch data:", error);
     }
-  }, []);
+  }, [fetchAll]);
 
   useEffect(() => {
     fetchData();
@@ -106,7 +142,7 @@ function App() {
   const renderPage = () => {
     switch (currentPage) {
       case Page.Dashboard:
-        return <Dashboard clients={clients} appointments={appointments} />;
+        return <Dashboard />;
       case Page.Clients:
         return <Clients clients={clients} addClient={addClient} addPet={addPet} deletePet={deletePet} />;
       case Page.Appointments:
@@ -123,7 +159,7 @@ function App() {
           fetchData={fetchData} // Pass fetchData to re-sync after sales etc.
         />;
       default:
-        return <Dashboard clients={clients} appointments={appointments} />;
+        return <Dashboard />;
     }
   };
 
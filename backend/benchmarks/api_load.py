@@ -0,0 +1,239 @@
+"""Mixed-workload load test of the API, run in-process against seeded data.
+
+Seeds a throwaway database with benchmarks.clinic_data, imports the app from
+main against it and drives it over ASGI with concurrent workers: POS
+checkouts, dashboard loads, forecast calls and paginated lists. Reports
+p50/p99 latency, errors and SQL statements per request for each workload,
+plus overall throughput.
+
+Results are compared with benchmarks/baselines/api_load.json, and the run
+exits non-zero on a regression. Latency baselines are only meaningful on the
+machine that recorded them; queries per request are not machine dependent.
+
+    cd backend
+    python -m benchmarks.api_load --scale small --requests 2000
+    python -m benchmarks.api_load --scale small --save-baseline
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines", "api_load.json")
+
+# Workload -> (weight, routes whose query counts it owns)
+WORKLOADS = {
+    "checkout": (30, [("POST", "/inventory/sales")]),
+    "dashboard": (20, [("GET", "/dashboard/summary")]),
+    "forecast": (5, [("GET", "/forecast/sales")]),
+    "lists": (45, [
+        ("GET", "/clients/"), ("GET", "/appointments/"), ("GET", "/inventory/sales"), ("GET", "/inventory/products"),
+    ]),
+}
+
+class Driver:
+    def __init__(self, client, products, rng):
+        self.client = client
+        self.products = products
+        self.rng = rng
+        # Each paginated list walks forward across calls and wraps at the end
+        self.cursors = {}
+
+    async def checkout(self):
+        items = [
+            {"product_id": product_id, "quantity": self.rng.randint(1, 2), "price": price}
+            for product_id, price in self.rng.sample(self.products, self.rng.randint(1, 4))
+        ]
+        sale = {
+            "total": round(sum(item["price"] * item["quantity"] for item in items), 2),
+            "date": datetime.now(timezone.utc).isoformat(),
+            "items": items,
+        }
+        return await self.client.post("/inventory/sales", json=sale)
+
+    async def dashboard(self):
+        return await self.client.get("/dashboard/summary")
+
+    async def forecast(self):
+        return await self.client.get("/forecast/sales")
+
+    async def lists(self):
+        today = date.today()
+        path, params = self.rng.choice([
+            ("/clients/", {"limit": 50}),
+            ("/inventory/sales", {"limit": 50}),
+            ("/inventory/products", {}),
+            ("/appointments/", {"limit": 50, "from": (today - timedelta(days=30)).isoformat(), "to": today.isoformat()}),
+        ])
+        cursor = self.cursors.get(path)
+        if cursor:
+            params = {**params, "after": cursor}
+        response = await self.client.get(path, params=params)
+        self.cursors[path] = response.headers.get("x-next-cursor")
+        return response
+
+async def run_load(app, products, requests: int, concurrency: int, warmup: int, seed: int):
+    import httpx
+    import metrics
+
+    names = list(WORKLOADS)
+    weights = [WORKLOADS[name][0] for name in names]
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    transport = httpx.ASGITransport(app=app)
+
+    async def worker(index, client, count, record):
+        rng = random.Random(seed * 1000 + index)
+        driver = Driver(client, products, rng)
+        for _ in range(count):
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            response = await getattr(driver, name)()
+            if record:
+                latencies[name].append((time.perf_counter() - started) * 1000)
+                if response.status_code >= 400:
+                    errors[name] += 1
+
+    def shares(total):
+        return [total // concurrency + (i < total % concurrency) for i in range(concurrency)]
+
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await asyncio.gather(*(worker(i, client, n, False) for i, n in enumerate(shares(warmup))))
+            before, slow_before = metrics.request_queries.totals(), metrics.slow_queries.value
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(i, client, n, True) for i, n in enumerate(shares(requests))))
+            elapsed = time.perf_counter() - started
+            after, slow_after = metrics.request_queries.totals(), metrics.slow_queries.value
+
+    workloads = {}
+    for name in names:
+        if not latencies[name]:
+            continue
+        count = sum(after.get(route, (0, 0))[0] - before.get(route, (0, 0))[0] for route in WORKLOADS[name][1])
+        queries = sum(after.get(route, (0, 0))[1] - before.get(route, (0, 0))[1] for route in WORKLOADS[name][1])
+        workloads[name] = {
+            "requests": len(latencies[name]),
+            "errors": errors[name],
+            "p50_ms": round(statistics.median(latencies[name]), 2),
+            "p99_ms": round(_percentile(latencies[name], 0.99), 2),
+            "queries_per_request": round(queries / count, 2) if count else None,
+        }
+    return {"throughput_rps": round(requests / elapsed, 1), "slow_queries": slow_after - slow_before, "workloads": workloads}
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def compare(result, baseline, tolerance: float, p99_tolerance: float, query_tolerance: float):
+    regressions = []
+    if result["throughput_rps"] < baseline["throughput_rps"] * (1 - tolerance):
+        regressions.append(f"throughput {result['throughput_rps']} < baseline {baseline['throughput_rps']} req/s")
+    for name, base in baseline["workloads"].items():
+        current = result["workloads"].get(name)
+        if current is None:
+            continue
+        for key, allowed, slack in (
+            ("p50_ms", tolerance, 0), ("p99_ms", p99_tolerance, 0),
+            # Cache hits make the mean wobble by a fraction of a query
+            ("queries_per_request", query_tolerance, 0.5),
+        ):
+            if base[key] is not None and current[key] is not None and current[key] > base[key] * (1 + allowed) + slack:
+                regressions.append(f"{name} {key} {current[key]} > baseline {base[key]} (+{allowed:.0%})")
+        if current["errors"] > base["errors"]:
+            regressions.append(f"{name} errors {current['errors']} > baseline {base['errors']}")
+    return regressions
+
+def report(result, baseline):
+    print(f"{'workload':<12}{'requests':>9}{'errors':>8}{'p50 ms':>9}{'p99 ms':>9}{'queries/req':>13}{'base p50':>10}{'base q/req':>12}")
+    for name, row in result["workloads"].items():
+        base = (baseline or {}).get("workloads", {}).get(name, {})
+        queries = "-" if row["queries_per_request"] is None else f"{row['queries_per_request']:.2f}"
+        base_p50 = "-" if "p50_ms" not in base else f"{base['p50_ms']:.2f}"
+        base_queries = "-" if base.get("queries_per_request") is None else f"{base['queries_per_request']:.2f}"
+        print(f"{name:<12}{row['requests']:>9}{row['errors']:>8}{row['p50_ms']:>9.2f}{row['p99_ms']:>9.2f}"
+              f"{queries:>13}{base_p50:>10}{base_queries:>12}")
+    base_rps = "" if not baseline else f" (baseline {baseline['throughput_rps']})"
+    print(f"\nthroughput: {result['throughput_rps']} req/s{base_rps}")
+    print(f"slow queries: {result['slow_queries']} (over SLOW_QUERY_MS; --verbose logs them)")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", default="small", help="a benchmarks.clinic_data scale")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50/throughput slowdown")
+    parser.add_argument("--p99-tolerance", type=float, default=0.5)
+    parser.add_argument("--query-tolerance", type=float, default=0.1)
+    parser.add_argument("--verbose", action="store_true", help="log slow queries as they happen")
+    parser.add_argument("--save-baseline", action="store_true", help="record this run as the scale's baseline")
+    args = parser.parse_args()
+    if not args.verbose:
+        logging.getLogger("metrics").setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Settings are read at import time, so point them at the scratch
+        # database before anything imports database/main
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        os.environ.pop("ASYNC_DATABASE_URL", None)
+        from sqlalchemy import create_engine, select
+        import models
+        from benchmarks.clinic_data import SCALES, generate
+
+        if args.scale not in SCALES:
+            parser.error(f"unknown scale {args.scale!r}, expected one of {', '.join(SCALES)}")
+        engine = create_engine(os.environ["DATABASE_URL"])
+        started = time.perf_counter()
+        generate(engine, seed=args.seed, **SCALES[args.scale])
+        with engine.connect() as conn:
+            products = [tuple(row) for row in conn.execute(select(models.Product.id, models.Product.price))]
+        engine.dispose()
+        print(f"seeded {args.scale} in {time.perf_counter() - started:.1f}s\n")
+
+        from main import app
+        import database
+        # The app's lifespan stops its background work on the way out;
+        # nothing may touch the scratch database once it's removed
+        result = asyncio.run(run_load(app, products, args.requests, args.concurrency, args.warmup, args.seed))
+        database.engine.dispose()
+        asyncio.run(database.async_engine.dispose())
+
+    result["config"] = {"requests": args.requests, "concurrency": args.concurrency, "warmup": args.warmup}
+    baselines = {}
+    if os.path.exists(BASELINES):
+        with open(BASELINES) as f:
+            baselines = json.load(f)
+    baseline = baselines.get(args.scale)
+    report(result, baseline)
+
+    if args.save_baseline:
+        baselines[args.scale] = result
+        os.makedirs(os.path.dirname(BASELINES), exist_ok=True)
+        with open(BASELINES, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline saved to {BASELINES}")
+        return
+    if baseline is None:
+        print("no baseline for this scale; rerun with --save-baseline to record one")
+        return
+    if baseline.get("config") != result["config"]:
+        print("warning: baseline was recorded with different settings:", baseline.get("config"))
+    regressions = compare(result, baseline, args.tolerance, args.p99_tolerance, args.query_tolerance)
+    for regression in regressions:
+        print("REGRESSION:", regression)
+    if regressions:
+        sys.exit(1)
+    print("no regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Synthetic clinic data at a configurable scale.
+
+Creates the schema through migrations.upgrade, bulk-loads clients, pets,
+appointments, the product/service catalog and sales with items through the
+models' tables, then rebuilds the sales rollups, the reorder points and the
+client search index. The output is an ordinary sql_app.db, so it can also back
+a local dev server.
+
+    cd backend
+    python -m benchmarks.clinic_data --scale medium --out /tmp/clinic.db
+"""
+import argparse
+import os
+import random
+import time
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import create_engine, insert
+import migrations, models, reorder, rollups, search
+
+SCALES = {
+    "small": {"clients": 2000, "appointments": 10000, "products": 200, "services": 20, "sales": 20000},
+    "medium": {"clients": 20000, "appointments": 100000, "products": 500, "services": 40, "sales": 200000},
+    "large": {"clients": 100000, "appointments": 500000, "products": 2000, "services": 80, "sales": 1000000},
+}
+
+FIRST_NAMES = [
+    "Ana", "Bruno", "Carla", "Diego", "Eduarda", "Felipe", "Gabriela", "Henrique", "Isabela", "João",
+    "Larissa", "Marcos", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Thiago", "Vitória", "Yuri",
+]
+LAST_NAMES = [
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira", "Lima", "Gomes",
+    "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes", "Vieira", "Barbosa",
+]
+PET_NAMES = ["Rex", "Luna", "Thor", "Mel", "Bob", "Nina", "Fred", "Pipoca", "Amora", "Simba", "Belinha", "Toby"]
+SPECIES = {
+    "Cachorro": ["Vira-lata", "Labrador", "Poodle", "Shih-tzu", "Golden Retriever"],
+    "Gato": ["SRD", "Siamês", "Persa", "Maine Coon"],
+    "Ave": ["Calopsita", "Periquito"],
+}
+REASONS = ["Consulta de rotina", "Vacinação", "Retorno", "Banho e tosa", "Exame de sangue", "Castração"]
+
+BATCH = 10000
+
+def _batches(conn, table, rows):
+    # executemany in fixed-size batches so memory stays flat at large scales
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH:
+            conn.execute(insert(table), batch)
+            batch = []
+    if batch:
+        conn.execute(insert(table), batch)
+
+def generate(engine, clients: int, appointments: int, products: int, services: int, sales: int,
+             pets_per_client: float = 1.5, items_per_sale: float = 2.5, history_days: int = 365, seed: int = 42):
+    migrations.upgrade(engine)
+    rng = random.Random(seed)
+    # Appointments use local wall-clock time, sales naive UTC
+    now = datetime.now()
+    utc_now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    product_prices = {i: round(rng.uniform(5, 300), 2) for i in range(1, products + 1)}
+    service_prices = {i: round(rng.uniform(40, 400), 2) for i in range(1, services + 1)}
+    pet_owners = []
+
+    def client_rows():
+        for i in range(1, clients + 1):
+            yield {
+                "id": i,
+                "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}",
+                "phone": f"({rng.randint(11, 99)}) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+                "email": f"cliente{i}@vetsoft.test",
+                "address": f"Rua {rng.choice(LAST_NAMES)}, {rng.randint(1, 2000)}",
+            }
+
+    def pet_rows():
+        for owner in range(1, clients + 1):
+            # Mean of pets_per_client, at least one
+            for _ in range(max(1, round(rng.uniform(1, 2 * pets_per_client - 1)))):
+                pet_owners.append(owner)
+                species = rng.choice(list(SPECIES))
+                yield {
+                    "id": len(pet_owners),
+                    "name": rng.choice(PET_NAMES),
+                    "species": species,
+                    "breed": rng.choice(SPECIES[species]),
+                    "birthDate": date.today() - timedelta(days=rng.randint(60, 15 * 365)),
+                    "ownerId": owner,
+                }
+
+    def appointment_rows():
+        for i in range(1, appointments + 1):
+            pet = rng.randint(1, len(pet_owners))
+            # Mostly history, plus the next month of bookings
+            day = now.date() + timedelta(days=rng.randint(-history_days, 30))
+            when = datetime.combine(day, datetime.min.time()).replace(hour=rng.randint(8, 18), minute=rng.choice((0, 30)))
+            if when > now:
+                status = models.AppointmentStatus.SCHEDULED
+            else:
+                status = rng.choices(
+                    (models.AppointmentStatus.COMPLETED, models.AppointmentStatus.CANCELED), (9, 1),
+                )[0]
+            yield {
+                "id": i, "clientId": pet_owners[pet - 1], "petId": pet, "date": when,
+                "reason": rng.choice(REASONS), "notes": None, "status": status,
+            }
+
+    sale_items = []
+
+    def sale_rows():
+        for i in range(1, sales + 1):
+            total = 0.0
+            for _ in range(max(1, round(rng.uniform(1, 2 * items_per_sale - 1)))):
+                quantity = rng.randint(1, 3)
+                if services and rng.random() < 0.3:
+                    service_id = rng.randint(1, services)
+                    item = {"sale_id": i, "product_id": None, "service_id": service_id, "price": service_prices[service_id]}
+                else:
+                    product_id = rng.randint(1, products)
+                    item = {"sale_id": i, "product_id": product_id, "service_id": None, "price": product_prices[product_id]}
+                item["quantity"] = quantity
+                total += item["price"] * quantity
+                sale_items.append(item)
+            yield {
+                "id": i, "total": round(total, 2),
+                "date": utc_now - timedelta(seconds=rng.randint(0, history_days * 86400)),
+            }
+
+    with engine.begin() as conn:
+        conn.execute(insert(models.Product), [
+            {"id": i, "name": f"Produto {i}", "description": "", "price": price, "stock": rng.randint(1000, 100000)}
+            for i, price in product_prices.items()
+        ])
+        if service_prices:
+            conn.execute(insert(models.Service), [
+                {"id": i, "name": f"Serviço {i}", "description": "", "price": price}
+                for i, price in service_prices.items()
+            ])
+        _batches(conn, models.Client.__table__, client_rows())
+        _batches(conn, models.Pet.__table__, pet_rows())
+        _batches(conn, models.Appointment.__table__, appointment_rows())
+        # Items are collected while the sales stream out, one batch behind
+        def flushed_sales():
+            for row in sale_rows():
+                yield row
+                if len(sale_items) >= BATCH:
+                    conn.execute(insert(models.SaleItem), sale_items)
+                    sale_items.clear()
+        _batches(conn, models.Sale.__table__, flushed_sales())
+        if sale_items:
+            conn.execute(insert(models.SaleItem), sale_items)
+        rollups.rebuild(conn)
+        reorder.rebuild(conn)
+
+    search.rebuild_index(engine)
+    return {"clients": clients, "pets": len(pet_owners), "appointments": appointments,
+            "products": products, "services": services, "sales": sales}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", required=True, help="SQLite file to create")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    for name in SCALES["small"]:
+        parser.add_argument(f"--{name}", type=int, help=f"override the scale's {name} count")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.out):
+        parser.error(f"{args.out} already exists")
+    counts = {name: getattr(args, name) if getattr(args, name) is not None else value
+              for name, value in SCALES[args.scale].items()}
+    engine = create_engine(f"sqlite:///{args.out}")
+    started = time.perf_counter()
+    created = generate(engine, seed=args.seed, **counts)
+    engine.dispose()
+    print(", ".join(f"{count} {name}" for name, count in created.items()), f"in {time.perf_counter() - started:.1f}s")
+
+if __name__ == "__main__":
+    main()
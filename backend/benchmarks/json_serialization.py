@@ -0,0 +1,92 @@
+"""Time per list page for the default and the FAST_JSON response paths.
+
+The default path loads ORM instances, validates them through the response
+schema and dumps the result, as FastAPI does for `response_model`. The fast
+path fetches plain column rows (crud `as_rows=True`) and encodes them with
+fast_json. Both produce the same JSON; the benchmark checks that too.
+
+    cd backend
+    python -m benchmarks.json_serialization --sale-items 200000 --limit 1000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+import crud, fast_json, schemas
+from benchmarks.relationship_loading import seed
+
+def orm_page(db, fetch, adapter, limit, after):
+    rows = fetch(db, limit, after, False)
+    fetched = time.perf_counter()
+    return rows, fetched, adapter.dump_json(adapter.validate_python(rows))
+
+def rows_page(db, fetch, adapter, limit, after):
+    rows = fetch(db, limit, after, True)
+    fetched = time.perf_counter()
+    return rows, fetched, fast_json.dumps(rows)
+
+def run_pages(Session, fetch, key, adapter, path, pages: int, limit: int):
+    totals, encodes, bodies, after = [], [], [], None
+    for _ in range(pages):
+        db = Session()
+        try:
+            started = time.perf_counter()
+            rows, fetched, body = path(db, fetch, adapter, limit, after)
+            finished = time.perf_counter()
+        finally:
+            db.close()
+        totals.append((finished - started) * 1000)
+        encodes.append((finished - fetched) * 1000)
+        bodies.append(body)
+        if not rows:
+            break
+        after = key(rows[-1])
+    return statistics.median(totals), statistics.median(encodes), bodies
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--pets-per-client", type=int, default=3)
+    parser.add_argument("--sale-items", type=int, default=200000)
+    parser.add_argument("--items-per-sale", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        started = time.perf_counter()
+        seed(engine, args.clients, args.pets_per_client, args.sale_items, args.items_per_sale)
+        print(f"seeded in {time.perf_counter() - started:.1f}s\n")
+
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        lists = {
+            "clients+pets": (
+                lambda db, limit, after, as_rows: crud.get_clients(db, limit=limit, after=after, as_rows=as_rows),
+                lambda c: c["id"] if isinstance(c, dict) else c.id,
+                TypeAdapter(List[schemas.Client]),
+            ),
+            "sales+items": (
+                lambda db, limit, after, as_rows: crud.get_sales(db, limit=limit, after=after, as_rows=as_rows),
+                lambda s: (s["date"].replace(tzinfo=None), s["id"]) if isinstance(s, dict) else (s.date, s.id),
+                TypeAdapter(List[schemas.Sale]),
+            ),
+        }
+        print(f"{'list':<14}{'path':<14}{'p50 ms/page':>12}{'encode ms':>11}{'KiB/page':>10}{'same JSON':>11}")
+        for name, (fetch, key, adapter) in lists.items():
+            baseline = None
+            for label, path in (("orm+validate", orm_page), ("rows+dumps", rows_page)):
+                total, encode, bodies = run_pages(Session, fetch, key, adapter, path, args.pages, args.limit)
+                same = "-" if baseline is None else ("yes" if bodies == baseline else "NO")
+                baseline = baseline or bodies
+                size = statistics.mean(len(body) for body in bodies) / 1024
+                print(f"{name:<14}{label:<14}{total:>12.2f}{encode:>11.2f}{size:>10.0f}{same:>11}")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
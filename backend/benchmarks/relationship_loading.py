@@ -0,0 +1,128 @@
+"""Rows fetched and latency per page for each relationship loading strategy.
+
+Seeds a throwaway SQLite database and pages through clients (with pets) and
+sales (with items) using both the old joined eager load and the chunked
+selectin loader from crud.
+
+    cd backend
+    python -m benchmarks.relationship_loading --clients 10000 --sale-items 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import date, datetime
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+import crud, models
+from settings import settings
+
+def seed(engine, clients: int, pets_per_client: int, sale_items: int, items_per_sale: int):
+    models.Base.metadata.create_all(bind=engine)
+    rng = random.Random(42)
+    batch = 10000
+    with engine.begin() as conn:
+        conn.execute(insert(models.Product), [
+            {"id": i, "name": f"Produto {i}", "description": "", "price": 10.0, "stock": 1000}
+            for i in range(1, 201)
+        ])
+        for start in range(1, clients + 1, batch):
+            ids = range(start, min(start + batch, clients + 1))
+            conn.execute(insert(models.Client), [
+                {"id": i, "name": f"Cliente {i}", "phone": "", "email": f"c{i}@vet.test", "address": ""} for i in ids
+            ])
+            conn.execute(insert(models.Pet), [
+                {"name": f"Pet {i}.{n}", "species": "Cachorro", "breed": "", "birthDate": date(2020, 1, 1), "ownerId": i}
+                for i in ids for n in range(pets_per_client)
+            ])
+        sales = sale_items // items_per_sale
+        for start in range(1, sales + 1, batch):
+            ids = range(start, min(start + batch, sales + 1))
+            conn.execute(insert(models.Sale), [
+                {"id": i, "total": 0.0, "date": datetime(2025, 1 + i % 12, 1 + i % 28, 10)} for i in ids
+            ])
+            conn.execute(insert(models.SaleItem), [
+                {"sale_id": i, "product_id": rng.randint(1, 200), "quantity": 1, "price": 10.0}
+                for i in ids for _ in range(items_per_sale)
+            ])
+
+class RowCounter:
+    # Re-runs every captured SELECT as COUNT(*) to learn how many rows (and
+    # row x column values) the statement actually shipped to the client.
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+        event.listen(engine, "before_cursor_execute", self._capture)
+
+    def _capture(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.statements.append((statement, parameters))
+
+    def rows(self):
+        statements, self.statements = self.statements, []
+        raw = self.engine.raw_connection()
+        rows = values = 0
+        try:
+            for statement, parameters in statements:
+                count = raw.cursor().execute(f"SELECT count(*) FROM ({statement})", parameters).fetchone()[0]
+                width = len(raw.cursor().execute(f"SELECT * FROM ({statement}) LIMIT 0", parameters).description)
+                rows += count
+                values += count * width
+        finally:
+            raw.close()
+        return len(statements), rows, values
+
+def run_pages(Session, counter, fetch, key, pages: int, limit: int):
+    latencies, queries, rows, values, after = [], [], [], [], None
+    for _ in range(pages):
+        db = Session()
+        try:
+            started = time.perf_counter()
+            page = fetch(db, limit, after)
+            latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            db.close()
+        counted = counter.rows()
+        queries.append(counted[0])
+        rows.append(counted[1])
+        values.append(counted[2])
+        if not page:
+            break
+        after = key(page[-1])
+    return statistics.median(latencies), statistics.mean(queries), statistics.mean(rows), statistics.mean(values)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--pets-per-client", type=int, default=3)
+    parser.add_argument("--sale-items", type=int, default=1000000)
+    parser.add_argument("--items-per-sale", type=int, default=5)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        started = time.perf_counter()
+        seed(engine, args.clients, args.pets_per_client, args.sale_items, args.items_per_sale)
+        print(f"seeded in {time.perf_counter() - started:.1f}s\n")
+
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        counter = RowCounter(engine)
+        lists = {
+            "clients+pets": (lambda db, limit, after: crud.get_clients(db, limit=limit, after=after), lambda c: c.id),
+            "sales+items": (lambda db, limit, after: crud.get_sales(db, limit=limit, after=after), lambda s: (s.date, s.id)),
+        }
+        print(f"{'list':<14}{'strategy':<10}{'p50 ms/page':>12}{'queries':>9}{'rows/page':>11}{'values/page':>13}")
+        for name, (fetch, key) in lists.items():
+            for strategy in ("joined", "selectin"):
+                settings.relationship_loading = strategy
+                latency, queries, rows, values = run_pages(Session, counter, fetch, key, args.pages, args.limit)
+                print(f"{name:<14}{strategy:<10}{latency:>12.2f}{queries:>9.1f}{rows:>11.0f}{values:>13.0f}")
+        engine.dispose()
+
+if __name__ == "__main__":
+    main()
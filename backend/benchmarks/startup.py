@@ -0,0 +1,137 @@
+"""Cold start time and resident memory of one uvicorn worker.
+
+Starts `uvicorn main:app` against a seeded scratch database and times how long
+it takes to answer its first request. The worker's RSS is read from /proc once
+it is up, then again after the first forecast, which is when pandas and the
+forecasting models get loaded. With --ref, the same measurement also runs
+against another git revision (checked out in a temporary worktree) for a
+before/after comparison. Linux only.
+
+    cd backend
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --runs 5 --ref HEAD~1
+"""
+import argparse
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _rss_mb(pid: int):
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+
+def _loaded(pid: int, package: str):
+    with open(f"/proc/{pid}/maps") as f:
+        return any(f"/{package}/" in line for line in f)
+
+def _get(url: str, timeout: float):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        response.read()
+        return response.status
+
+def measure(backend: str, env: dict, timeout: float):
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    worker = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=backend, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            if worker.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with {worker.returncode} in {backend}")
+            if time.perf_counter() - started > timeout:
+                raise TimeoutError(f"worker not ready after {timeout}s")
+            try:
+                if _get(f"{base}/forecast/status", 1) == 200:
+                    break
+            except OSError:
+                time.sleep(0.01)
+        result = {
+            "ready_ms": (time.perf_counter() - started) * 1000,
+            "rss_ready_mb": _rss_mb(worker.pid),
+            "pandas_at_ready": _loaded(worker.pid, "pandas"),
+        }
+        started = time.perf_counter()
+        _get(f"{base}/forecast/sales", timeout)
+        result["first_forecast_ms"] = (time.perf_counter() - started) * 1000
+        result["rss_forecast_mb"] = _rss_mb(worker.pid)
+        return result
+    finally:
+        worker.terminate()
+        worker.wait()
+
+def run(label: str, backend: str, db_template: str, runs: int, migrate: bool, timeout: float):
+    results = []
+    for _ in range(runs):
+        # A fresh copy each run, so no run starts from another's page cache
+        # state or migrations
+        with tempfile.TemporaryDirectory() as tmp:
+            db = os.path.join(tmp, "startup.db")
+            shutil.copy(db_template, db)
+            env = {
+                **os.environ,
+                "DATABASE_URL": f"sqlite:///{db}",
+                "MIGRATE_ON_STARTUP": "true" if migrate else "false",
+                "PYTHONPATH": backend,
+            }
+            env.pop("ASYNC_DATABASE_URL", None)
+            results.append(measure(backend, env, timeout))
+    row = {key: statistics.median(r[key] for r in results) for key in ("ready_ms", "rss_ready_mb", "first_forecast_ms", "rss_forecast_mb")}
+    row["pandas_at_ready"] = "yes" if any(r["pandas_at_ready"] for r in results) else "no"
+    print(f"{label:<12}{row['ready_ms']:>10.0f}{row['rss_ready_mb']:>11.1f}{row['pandas_at_ready']:>14}"
+          f"{row['first_forecast_ms']:>16.0f}{row['rss_forecast_mb']:>16.1f}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--scale", default="small", help="a benchmarks.clinic_data scale")
+    parser.add_argument("--ref", help="also measure this git revision, for a before/after comparison")
+    parser.add_argument("--no-migrate", action="store_true", help="start workers with MIGRATE_ON_STARTUP=false")
+    parser.add_argument("--timeout", type=float, default=120)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "template.db")
+        # Settings are read on import; keep this process off sql_app.db
+        os.environ["DATABASE_URL"] = f"sqlite:///{template}"
+        from sqlalchemy import create_engine
+        from benchmarks.clinic_data import SCALES, generate
+
+        engine = create_engine(os.environ["DATABASE_URL"])
+        generate(engine, **SCALES[args.scale])
+        engine.dispose()
+        del os.environ["DATABASE_URL"]
+
+        print(f"median of {args.runs} cold starts per tree, {args.scale} data\n")
+        print(f"{'tree':<12}{'ready ms':>10}{'RSS MB':>11}{'pandas ready':>14}{'forecast ms':>16}{'RSS after MB':>16}")
+        if args.ref:
+            worktree = os.path.join(tmp, "ref")
+            subprocess.run(["git", "worktree", "add", "--detach", "-q", worktree, args.ref], cwd=BACKEND, check=True)
+            try:
+                subdir = os.path.relpath(BACKEND, subprocess.run(
+                    ["git", "rev-parse", "--show-toplevel"], cwd=BACKEND, check=True, capture_output=True, text=True,
+                ).stdout.strip())
+                run(args.ref, os.path.join(worktree, subdir), template, args.runs, not args.no_migrate, args.timeout)
+            finally:
+                subprocess.run(["git", "worktree", "remove", "--force", worktree], cwd=BACKEND, check=True)
+        run("working", BACKEND, template, args.runs, not args.no_migrate, args.timeout)
+
+if __name__ == "__main__":
+    main()
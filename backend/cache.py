@@ -0,0 +1,188 @@
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from itertools import chain
+from fastapi import Request, Response
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+import models
+
+_caches = []
+# Tables whose versions live in cache_versions and are bumped on commit
+_shared_tables = set()
+
+class TTLCache:
+    # Small in-process cache for derived data. Entries expire after ttl
+    # seconds and are dropped as soon as a commit touches one of `tables`
+    # (the outermost commit, once the write is visible to readers).
+
+    def __init__(self, ttl: float, tables):
+        self.ttl = ttl
+        self.tables = frozenset(tables)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generation = 0
+        _caches.append(self)
+
+    def get_or_set(self, key, factory):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+            generation = self._generation
+        value = factory()
+        with self._lock:
+            # A commit that landed while building makes this value stale
+            if self._generation == generation:
+                self._entries = {k: e for k, e in self._entries.items() if e[0] > now}
+                self._entries[key] = (now + self.ttl, value)
+        return value
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+class ConditionalCache:
+    # Serialized list responses for one table, answered with ETag and
+    # Last-Modified so clients can revalidate with a 304. Entries are tied to
+    # the table's version, which moves on every commit that writes to it.
+    # With shared=True the version is read from cache_versions, so several
+    # worker processes agree on it; otherwise it is kept in this process,
+    # which never sees other workers' commits, so entries are also rebuilt
+    # after ttl seconds.
+
+    def __init__(self, table: str, shared: bool, max_entries: int, ttl: float):
+        self.tables = frozenset([table])
+        self.table = table
+        self.shared = shared
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._version = 0
+        self._modified = datetime.now(timezone.utc)
+        _caches.append(self)
+        if shared:
+            _shared_tables.add(table)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._version += 1
+            self._modified = datetime.now(timezone.utc)
+
+    async def _current(self, db: AsyncSession):
+        if not self.shared:
+            with self._lock:
+                return self._version, self._modified
+        row = (await db.execute(
+            select(models.CacheVersion.version, models.CacheVersion.updated_at)
+            .where(models.CacheVersion.name == self.table)
+        )).first()
+        if row is None or row.updated_at is None:
+            return (row.version if row else 0), None
+        return row.version, row.updated_at.replace(tzinfo=timezone.utc)
+
+    async def respond(self, request: Request, db: AsyncSession, key, build):
+        # build() returns (JSON body bytes, extra headers) for a cache miss
+        version, modified = await self._current(db)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[0] != version or entry[1] <= now:
+            body, extra = await build()
+            etag = f'"{hashlib.sha1(body).hexdigest()}"'
+            if entry is not None and entry[0] == version and entry[3]["ETag"] != etag:
+                # Expired and changed since: another worker wrote the table
+                self.invalidate()
+                version, modified = await self._current(db)
+            headers = {**extra, "ETag": etag, "Cache-Control": "no-cache"}
+            if modified is not None:
+                headers["Last-Modified"] = format_datetime(modified, usegmt=True)
+            expires = float("inf") if self.shared else now + self.ttl
+            entry = (version, expires, body, headers)
+            with self._lock:
+                # A write that landed while building makes this entry stale
+                if self.shared or self._version == version:
+                    if len(self._entries) >= self.max_entries:
+                        self._entries.pop(next(iter(self._entries)))
+                    self._entries[key] = entry
+
+        _, _, body, headers = entry
+        if _not_modified(request, headers):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+def _not_modified(request: Request, headers):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or headers["ETag"] in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None or "Last-Modified" not in headers:
+        return False
+    try:
+        return parsedate_to_datetime(headers["Last-Modified"]) <= parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+
+def invalidate_tables(tables):
+    for cache in _caches:
+        if cache.tables & tables:
+            cache.invalidate()
+
+def _changed_tables(session: Session):
+    return session.info.setdefault("changed_tables", set())
+
+@event.listens_for(Session, "after_flush")
+def _record_flushed_tables(session, flush_context):
+    tables = _changed_tables(session)
+    for obj in chain(session.new, session.dirty, session.deleted):
+        tables.add(obj.__table__.name)
+
+@event.listens_for(Session, "do_orm_execute")
+def _record_bulk_tables(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _changed_tables(orm_execute_state.session).add(orm_execute_state.statement.table.name)
+
+# Releasing or rolling back a SAVEPOINT fires the commit and rollback events
+# too. Only the outermost transaction makes writes visible, so these hooks
+# skip nested ones and act once, when it commits or rolls back.
+
+@event.listens_for(Session, "before_commit")
+def _bump_shared_versions(session):
+    if session.in_nested_transaction():
+        return
+    session.flush()
+    tables = sorted(_changed_tables(session) & _shared_tables)
+    if not tables:
+        return
+    # Core statements on the session's connection, so the bump commits with
+    # the write and doesn't register as an ORM write itself
+    conn = session.connection()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    for table in tables:
+        bumped = conn.execute(
+            update(models.CacheVersion)
+            .where(models.CacheVersion.name == table)
+            .values(version=models.CacheVersion.version + 1, updated_at=now)
+        )
+        if bumped.rowcount == 0:
+            conn.execute(insert(models.CacheVersion).values(name=table, version=1, updated_at=now))
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_tables(session):
+    if session.in_nested_transaction():
+        return
+    invalidate_tables(session.info.pop("changed_tables", set()))
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back_tables(session):
+    if session.in_nested_transaction():
+        return
+    session.info.pop("changed_tables", None)
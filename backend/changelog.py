@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, event, insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+import models
+
+# Tables the frontend keeps a copy of. A change to a child row is also logged
+# against the parent it is embedded in (pets in clients, items in sales).
+TRACKED = {"clients", "pets", "appointments", "products", "services", "sales"}
+PARENTS = {
+    "pets": ("clients", "ownerId"),
+    "sale_items": ("sales", "sale_id"),
+}
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _write(session: Session, changes):
+    if not changes:
+        return
+    now = _now()
+    # Core insert on the session's connection: it commits or rolls back with
+    # the write and doesn't re-enter the flush
+    session.connection().execute(
+        insert(models.ChangeLog),
+        [{"table_name": table, "row_id": row_id, "op": op, "changed_at": now} for table, row_id, op in changes],
+    )
+
+def record(db: Session, table: str, row_ids, op: str = UPSERT):
+    # For Core INSERT/UPDATE statements the unit of work never sees
+    _write(db, [(table, row_id, op) for row_id in dict.fromkeys(row_ids) if row_id is not None])
+
+def _changes(obj, op):
+    table = obj.__table__.name
+    if table in TRACKED:
+        yield table, obj.id, op
+    if table in PARENTS:
+        parent, column = PARENTS[table]
+        yield parent, getattr(obj, column), UPSERT
+
+@event.listens_for(Session, "after_flush")
+def _log_flushed_rows(session, flush_context):
+    changes = []
+    for obj in session.new:
+        changes.extend(_changes(obj, UPSERT))
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            changes.extend(_changes(obj, UPSERT))
+    for obj in session.deleted:
+        changes.extend(_changes(obj, DELETE))
+    _write(session, [change for change in dict.fromkeys(changes) if change[1] is not None])
+
+def prune(engine: Engine, retention_days: int):
+    # Clients holding a version older than what is left get reset=True
+    with engine.begin() as conn:
+        conn.execute(delete(models.ChangeLog).where(models.ChangeLog.changed_at < _now() - timedelta(days=retention_days)))
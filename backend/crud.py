@@ -1,16 +1,129 @@
+from sqlalchemy import String, func, insert, select, tuple_, type_coerce, update
 from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm.attributes import set_committed_value
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
 from fastapi import HTTPException
-import models, schemas
+import changelog, idempotency, models, reorder, rollups, schemas, search
+from settings import settings
 
 def get_client(db: Session, client_id: int):
     return db.query(models.Client).filter(models.Client.id == client_id).first()
 
-def get_clients(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Client).options(joinedload(models.Client.pets)).offset(skip).limit(limit).all()
+def _load_in_chunks(db: Session, parents, relationship, as_rows: bool = False):
+    # Loads a one-to-many relationship for a page of parents with one
+    # `WHERE fk IN (...)` query per chunk, so every child row crosses the
+    # wire once and LIMIT applies to the parents only. With as_rows the
+    # parents and children are schema-shaped dicts instead of ORM objects.
+    prop = relationship.property
+    ((parent_column, child_column),) = prop.local_remote_pairs
+    child = prop.mapper.class_
+    if as_rows:
+        keys = [parent[parent_column.key] for parent in parents]
+        loaded = _schema_columns(child)
+    else:
+        keys = [getattr(parent, parent_column.key) for parent in parents]
+        loaded = [child]
+    children = defaultdict(list)
+    chunk_size = settings.relationship_chunk_size
+    for start in range(0, len(keys), chunk_size):
+        stmt = (
+            select(child_column.label("_parent"), *loaded)
+            .where(child_column.in_(keys[start:start + chunk_size]))
+            .order_by(child_column, child.id)
+        )
+        for row in db.execute(stmt):
+            if as_rows:
+                row = dict(row._mapping)
+                children[row.pop("_parent")].append(row)
+            else:
+                key, obj = row
+                children[key].append(obj)
+    for parent, key in zip(parents, keys):
+        if as_rows:
+            parent[prop.key] = children.get(key, [])
+        else:
+            set_committed_value(parent, prop.key, children.get(key, []))
+
+# Response schema for each model, used to shape plain-row results
+ROW_SCHEMAS = {
+    models.Client: schemas.Client,
+    models.Pet: schemas.Pet,
+    models.Appointment: schemas.Appointment,
+    models.Product: schemas.Product,
+    models.Service: schemas.Service,
+    models.Sale: schemas.Sale,
+    models.SaleItem: schemas.SaleItem,
+}
+
+def _schema_columns(model):
+    # The table columns the response schema exposes, in schema field order
+    columns = model.__table__.c
+    return [columns[name] for name in ROW_SCHEMAS[model].model_fields if name in columns]
+
+def _row_query(query):
+    # Same query, but only the response columns come back
+    return query.with_entities(*_schema_columns(query.column_descriptions[0]["entity"]))
+
+def _fetch_rows(db: Session, query, *relationships):
+    # Dicts shaped like the schema: no ORM identity map, no per-row
+    # instances, no validation. Children use the same chunked IN loading.
+    parents = [dict(row._mapping) for row in _row_query(query)]
+    for relationship in relationships:
+        _load_in_chunks(db, parents, relationship, as_rows=True)
+    return parents
+
+def _iter_rows(db: Session, query, *relationships, chunk_size: int = 1000):
+    # Streams _fetch_rows results through a server-side cursor, one chunk of
+    # parents (with their children) at a time
+    result = db.execute(_row_query(query).statement.execution_options(yield_per=chunk_size))
+    for chunk in result.mappings().partitions():
+        parents = [dict(row) for row in chunk]
+        for relationship in relationships:
+            _load_in_chunks(db, parents, relationship, as_rows=True)
+        yield parents
+
+def _fetch_with(db: Session, query, *relationships, as_rows: bool = False):
+    if as_rows:
+        return _fetch_rows(db, query, *relationships)
+    if settings.relationship_loading == "joined":
+        return query.options(*(joinedload(r) for r in relationships)).all()
+    parents = query.all()
+    for relationship in relationships:
+        _load_in_chunks(db, parents, relationship)
+    return parents
+
+def get_client_with_pets(db: Session, client_id: int):
+    db_client = get_client(db, client_id)
+    if db_client:
+        _load_in_chunks(db, [db_client], models.Client.pets)
+    return db_client
+
+def _after_id(query, model, after):
+    query = query.order_by(model.id)
+    if after is not None:
+        query = query.filter(model.id > after)
+    return query
+
+def search_clients(db: Session, query: str, limit: int = 20):
+    ids = search.search_client_ids(db, query, limit)
+    clients = {client.id: client for client in db.query(models.Client).filter(models.Client.id.in_(ids))}
+    ranked = [clients[id] for id in ids if id in clients]
+    _load_in_chunks(db, ranked, models.Client.pets)
+    return ranked
+
+def get_clients(db: Session, skip: int = 0, limit: int = 100, after: int = None, as_rows: bool = False):
+    query = _after_id(db.query(models.Client), models.Client, after)
+    return _fetch_with(db, query.offset(skip).limit(limit), models.Client.pets, as_rows=as_rows)
+
+def iter_clients(db: Session, chunk_size: int = 1000):
+    return _iter_rows(db, _after_id(db.query(models.Client), models.Client, None), models.Client.pets, chunk_size=chunk_size)
 
 def create_client(db: Session, client: schemas.ClientCreate):
     db_client = models.Client(**client.model_dump())
     db.add(db_client)
+    db.flush()
+    search.reindex_clients(db, [db_client.id])
     db.commit()
     db.refresh(db_client)
     return db_client
@@ -18,12 +131,18 @@ def create_client(db: Session, client: schemas.ClientCreate):
 def get_pet(db: Session, pet_id: int):
     return db.query(models.Pet).filter(models.Pet.id == pet_id).first()
 
-def get_pets(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Pet).offset(skip).limit(limit).all()
+def get_pets(db: Session, skip: int = 0, limit: int = 100, after: int = None, as_rows: bool = False):
+    query = _after_id(db.query(models.Pet), models.Pet, after).offset(skip).limit(limit)
+    return _fetch_with(db, query, as_rows=as_rows)
+
+def iter_pets(db: Session, chunk_size: int = 1000):
+    return _iter_rows(db, _after_id(db.query(models.Pet), models.Pet, None), chunk_size=chunk_size)
 
 def create_pet(db: Session, pet: schemas.PetCreate):
     db_pet = models.Pet(**pet.model_dump())
     db.add(db_pet)
+    db.flush()
+    search.reindex_clients(db, [db_pet.ownerId])
     db.commit()
     db.refresh(db_pet)
     return db_pet
@@ -32,14 +151,35 @@ def delete_pet(db: Session, pet_id: int):
     db_pet = get_pet(db, pet_id)
     if db_pet:
         db.delete(db_pet)
+        db.flush()
+        search.reindex_clients(db, [db_pet.ownerId])
         db.commit()
     return db_pet
 
 def get_appointment(db: Session, appointment_id: int):
     return db.query(models.Appointment).filter(models.Appointment.id == appointment_id).first()
 
-def get_appointments(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Appointment).offset(skip).limit(limit).all()
+def _filter_appointments(query, date_from: datetime = None, date_to: datetime = None, status: models.AppointmentStatus = None, client_id: int = None, pet_id: int = None):
+    # [date_from, date_to), each bound optional
+    if date_from is not None:
+        query = query.filter(models.Appointment.date >= date_from)
+    if date_to is not None:
+        query = query.filter(models.Appointment.date < date_to)
+    if status is not None:
+        query = query.filter(models.Appointment.status == status)
+    if client_id is not None:
+        query = query.filter(models.Appointment.clientId == client_id)
+    if pet_id is not None:
+        query = query.filter(models.Appointment.petId == pet_id)
+    return query
+
+def get_appointments(db: Session, skip: int = 0, limit: int = 100, after: int = None, as_rows: bool = False, **filters):
+    query = _filter_appointments(db.query(models.Appointment), **filters)
+    return _fetch_with(db, _after_id(query, models.Appointment, after).offset(skip).limit(limit), as_rows=as_rows)
+
+def iter_appointments(db: Session, chunk_size: int = 1000, **filters):
+    query = _filter_appointments(db.query(models.Appointment), **filters)
+    return _iter_rows(db, _after_id(query, models.Appointment, None), chunk_size=chunk_size)
 
 def create_appointment(db: Session, appointment: schemas.AppointmentCreate):
     db_appointment = models.Appointment(**appointment.model_dump())
@@ -56,8 +196,9 @@ def update_appointment_status(db: Session, appointment_id: int, status: schemas.
         db.refresh(db_appointment)
     return db_appointment
 
-def get_products(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Product).offset(skip).limit(limit).all()
+def get_products(db: Session, skip: int = 0, limit: int = 100, after: int = None, as_rows: bool = False):
+    query = _after_id(db.query(models.Product), models.Product, after).offset(skip).limit(limit)
+    return _fetch_with(db, query, as_rows=as_rows)
 
 def get_product(db: Session, product_id: int):
     return db.query(models.Product).filter(models.Product.id == product_id).first()
@@ -68,6 +209,8 @@ def get_product_by_name(db: Session, name: str):
 def create_product(db: Session, product: schemas.ProductCreate):
     db_product = models.Product(**product.model_dump())
     db.add(db_product)
+    db.flush()
+    reorder.evaluate(db, [db_product.id])
     db.commit()
     db.refresh(db_product)
     return db_product
@@ -78,6 +221,9 @@ def update_product(db: Session, product_id: int, product: schemas.ProductUpdate)
         update_data = product.model_dump(exclude_unset=True)
         for key, value in update_data.items():
             setattr(db_product, key, value)
+        if "stock" in update_data:
+            db.flush()
+            reorder.evaluate(db, [product_id])
         db.commit()
         db.refresh(db_product)
     return db_product
@@ -85,12 +231,14 @@ def update_product(db: Session, product_id: int, product: schemas.ProductUpdate)
 def delete_product(db: Session, product_id: int):
     db_product = get_product(db, product_id)
     if db_product:
+        reorder.forget(db, product_id)
         db.delete(db_product)
         db.commit()
     return db_product
 
-def get_services(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Service).offset(skip).limit(limit).all()
+def get_services(db: Session, skip: int = 0, limit: int = 100, after: int = None, as_rows: bool = False):
+    query = _after_id(db.query(models.Service), models.Service, after).offset(skip).limit(limit)
+    return _fetch_with(db, query, as_rows=as_rows)
 
 def get_service(db: Session, service_id: int):
     return db.query(models.Service).filter(models.Service.id == service_id).first()
@@ -122,38 +270,294 @@ def delete_service(db: Session, service_id: int):
         db.commit()
     return db_service
 
-def get_sales(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Sale).options(joinedload(models.Sale.items)).order_by(models.Sale.date.desc()).offset(skip).limit(limit).all()
+def get_sales(db: Session, skip: int = 0, limit: int = 100, after: tuple = None, as_rows: bool = False):
+    # Newest first on (date, id), which ix_sales_date_id serves in both
+    # directions; `after` continues strictly past the last row of a page.
+    query = db.query(models.Sale)
+    if after is not None:
+        query = query.filter(tuple_(models.Sale.date, models.Sale.id) < after)
+    query = query.order_by(models.Sale.date.desc(), models.Sale.id.desc()).offset(skip).limit(limit)
+    sales = _fetch_with(db, query, models.Sale.items, as_rows=as_rows)
+    return _utc_sale_rows(sales) if as_rows else sales
+
+def _utc_sale_rows(sales):
+    # schemas.Sale marks its naive UTC dates as UTC when serializing
+    for sale in sales:
+        sale["date"] = sale["date"].replace(tzinfo=timezone.utc)
+    return sales
+
+def iter_sales(db: Session, chunk_size: int = 1000):
+    query = db.query(models.Sale).order_by(models.Sale.date.desc(), models.Sale.id.desc())
+    for chunk in _iter_rows(db, query, models.Sale.items, chunk_size=chunk_size):
+        yield _utc_sale_rows(chunk)
 
 def get_sales_count(db: Session):
     return db.query(models.Sale).count()
 
+def _columns(rows, width: int):
+    # Transposes result rows into one list per column, ready for NumPy/pandas.
+    return tuple(map(list, zip(*rows))) if rows else tuple([] for _ in range(width))
+
+def get_last_sale_day(db: Session):
+    return db.query(func.max(models.SalesDaily.day)).scalar()
+
+def iter_daily_sales_totals(db: Session, since: date, chunk_size: int = 1000):
+    # Streams the windowed daily totals from the rollup in chunks, one row
+    # per day however many sales the window covers.
+    # Days come back as the stored ISO strings, like func.date() used to
+    # return; parsing thousands of them into dates only to hand them to
+    # pandas is wasted work
+    daily = models.SalesDaily
+    stmt = (
+        select(type_coerce(daily.day, String), daily.revenue)
+        .where(daily.day >= since)
+        .order_by(daily.day)
+        .execution_options(yield_per=chunk_size)
+    )
+    for chunk in db.execute(stmt).partitions():
+        yield _columns(chunk, 2)
+
+def iter_daily_product_quantities(db: Session, since: date, chunk_size: int = 1000):
+    daily = models.ProductSalesDaily
+    stmt = (
+        select(type_coerce(daily.day, String), daily.product_id, daily.units)
+        .where(daily.day >= since)
+        .execution_options(yield_per=chunk_size)
+    )
+    for chunk in db.execute(stmt).partitions():
+        yield _columns(chunk, 3)
+
+def get_sales_report(db: Session, start: date = None, end: date = None):
+    # Totals, the daily series and per-product totals for [start, end],
+    # all read from the rollups
+    daily, product_daily = models.SalesDaily, models.ProductSalesDaily
+    days = db.query(daily).order_by(daily.day)
+    products = (
+        db.query(
+            product_daily.product_id,
+            func.sum(product_daily.revenue).label("revenue"),
+            func.sum(product_daily.units).label("units"),
+            func.sum(product_daily.transactions).label("transactions"),
+        )
+        .group_by(product_daily.product_id)
+        .order_by(product_daily.product_id)
+    )
+    if start is not None:
+        days = days.filter(daily.day >= start)
+        products = products.filter(product_daily.day >= start)
+    if end is not None:
+        days = days.filter(daily.day <= end)
+        products = products.filter(product_daily.day <= end)
+    days = days.all()
+    return {
+        "revenue": sum(day.revenue for day in days),
+        "units": sum(day.units for day in days),
+        "transactions": sum(day.transactions for day in days),
+        "days": days,
+        "products": [row._asdict() for row in products],
+    }
+
+def get_product_stock_levels(db: Session, product_ids):
+    rows = (
+        db.query(models.Product.id, models.Product.name, models.Product.stock)
+        .filter(models.Product.id.in_(product_ids))
+        .order_by(models.Product.id)
+        .all()
+    )
+    return _columns(rows, 3)
+
+def get_dashboard_counts(db: Session, now: datetime):
+    # All headline numbers in a single round trip
+    return db.query(
+        select(func.count(models.Client.id)).scalar_subquery().label("total_clients"),
+        select(func.count(models.Pet.id)).scalar_subquery().label("total_pets"),
+        select(func.count(models.Appointment.id))
+            .where(models.Appointment.date >= now)
+            .scalar_subquery().label("upcoming_appointments"),
+        select(func.coalesce(func.sum(models.SalesDaily.revenue), 0.0)).scalar_subquery().label("total_revenue"),
+        select(func.count(models.ReorderPoint.product_id))
+            .where(models.ReorderPoint.needs_reorder.is_(True))
+            .scalar_subquery().label("low_stock_products"),
+    ).one()._asdict()
+
+def get_appointment_counts_by_day(db: Session, start: date, end: date, **filters):
+    day = func.date(models.Appointment.date)
+    query = _filter_appointments(
+        db.query(day, func.count(models.Appointment.id)),
+        date_from=datetime.combine(start, time.min),
+        date_to=datetime.combine(end, time.min),
+        **filters,
+    )
+    return dict(query.group_by(day).all())
+
+def get_reorder_list(db: Session):
+    # Served from the needs_reorder index, most urgent (least cover) first
+    point, product = models.ReorderPoint, models.Product
+    rows = (
+        db.query(
+            product.id.label("product_id"), product.name, product.stock,
+            point.reorder_point, point.daily_velocity, point.updated_at,
+        )
+        .join(point, point.product_id == product.id)
+        .filter(point.needs_reorder.is_(True))
+        .order_by((product.stock - point.reorder_point), product.id)
+        .all()
+    )
+    return [
+        {**row._asdict(), "suggested_quantity": max(1, 2 * row.reorder_point - row.stock)}
+        for row in rows
+    ]
+
+def get_sales_version(db: Session):
+    count, last_id = db.query(func.count(models.Sale.id), func.max(models.Sale.id)).one()
+    return (count, last_id)
+
 def create_sale(db: Session, sale: schemas.SaleCreate):
+    response = _insert_sale(db, sale)
+    db.commit()
+    return response
+
+def create_sale_once(db: Session, sale: schemas.SaleCreate, idempotency_key: str):
+    # create_sale for retrying POS terminals: a repeat with the same key
+    # returns the first sale instead of selling (and deducting stock) twice
+    return idempotency.run_once(
+        db, "POST /inventory/sales", idempotency_key, sale, lambda: _insert_sale(db, sale), schemas.Sale,
+    )
 
+def _insert_sale(db: Session, sale: schemas.SaleCreate):
+    quantities = defaultdict(int)
     for item in sale.items:
         if item.product_id:
-            db_product = get_product(db, item.product_id)
-            if not db_product:
-                raise HTTPException(status_code=404, detail=f"Product with id {item.product_id} not found")
-            if db_product.stock < item.quantity:
-                raise HTTPException(status_code=400, detail=f"Not enough stock for product {db_product.name}. Available: {db_product.stock}, Required: {item.quantity}")
-
+            quantities[item.product_id] += item.quantity
+
+    # One query for every referenced product, only to report friendly errors;
+    # the conditional UPDATE below is what actually guards the stock.
+    products = {
+        row.id: row
+        for row in db.query(models.Product.id, models.Product.name, models.Product.stock)
+        .filter(models.Product.id.in_(quantities))
+    }
+    for product_id, quantity in quantities.items():
+        db_product = products.get(product_id)
+        if not db_product:
+            raise HTTPException(status_code=404, detail=f"Product with id {product_id} not found")
+        if db_product.stock < quantity:
+            raise HTTPException(status_code=400, detail=f"Not enough stock for product {db_product.name}. Available: {db_product.stock}, Required: {quantity}")
+
+    # Sale and items go out in one flush; the items as a single batched INSERT
     db_sale = models.Sale(total=sale.total, date=sale.date)
+    db_sale.items = [models.SaleItem(**item.model_dump()) for item in sale.items]
     db.add(db_sale)
-    db.flush() 
-
-    for item in sale.items:
-        db_item = models.SaleItem(**item.model_dump(), sale_id=db_sale.id)
-        db.add(db_item)
-
-        if item.product_id:
-
-            db_product = get_product(db, item.product_id)
-            if db_product:
-                db_product.stock -= item.quantity
-
-    db.commit()
-    db.refresh(db_sale)
-    db_sale = db.query(models.Sale).options(joinedload(models.Sale.items)).filter(models.Sale.id == db_sale.id).first()
-
-    return db_sale
+    db.flush()
+
+    for product_id, quantity in quantities.items():
+        result = db.execute(
+            update(models.Product)
+            .where(models.Product.id == product_id, models.Product.stock >= quantity)
+            .values(stock=models.Product.stock - quantity)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            # Another checkout took the stock between our read and this write
+            db.rollback()
+            raise HTTPException(status_code=409, detail=f"Not enough stock for product {products[product_id].name}. Please retry.")
+    changelog.record(db, "products", quantities)
+    rollups.add_sales(db, [db_sale])
+    reorder.evaluate(db, quantities)
+
+    # Serialize before commit expires the instances, so building the response
+    # costs no extra round trips
+    return schemas.Sale.model_validate(db_sale, from_attributes=True)
+
+SYNC_TABLES = {
+    "clients": (models.Client, models.Client.pets),
+    "pets": (models.Pet, None),
+    "appointments": (models.Appointment, None),
+    "products": (models.Product, None),
+    "services": (models.Service, None),
+    "sales": (models.Sale, models.Sale.items),
+}
+
+def get_changes(db: Session, since: int = None, limit: int = 5000):
+    # Collapses the log after `since` to the latest operation per row and
+    # loads the current state of every row still present. Returns
+    # (version, reset, more, {table: (rows, deleted ids)}).
+    oldest, latest = db.query(func.min(models.ChangeLog.id), func.max(models.ChangeLog.id)).one()
+    latest = latest or 0
+    if since is None or since > latest or (oldest is not None and since < oldest - 1):
+        # No version yet, an unknown one, or the log no longer reaches back
+        # that far: the client has to reload everything from `latest` on
+        return latest, True, False, {}
+
+    entries = (
+        db.query(models.ChangeLog.id, models.ChangeLog.table_name, models.ChangeLog.row_id, models.ChangeLog.op)
+        .filter(models.ChangeLog.id > since)
+        .order_by(models.ChangeLog.id)
+        .limit(limit + 1)
+        .all()
+    )
+    more = len(entries) > limit
+    entries = entries[:limit]
+    version = entries[-1].id if entries else since
+
+    last_op = {}
+    for entry in entries:
+        last_op[(entry.table_name, entry.row_id)] = entry.op
+
+    changes = {}
+    for table, (model, relationship) in SYNC_TABLES.items():
+        upserted = [row_id for (name, row_id), op in last_op.items() if name == table and op == changelog.UPSERT]
+        deleted = {row_id for (name, row_id), op in last_op.items() if name == table and op == changelog.DELETE}
+        rows = db.query(model).filter(model.id.in_(upserted)).order_by(model.id).all() if upserted else []
+        if relationship is not None:
+            _load_in_chunks(db, rows, relationship)
+        # Logged as upserted but gone since (e.g. a later, pruned delete)
+        deleted |= set(upserted) - {row.id for row in rows}
+        if rows or deleted:
+            changes[table] = (rows, sorted(deleted))
+    return version, False, more, changes
+
+def bulk_insert(db: Session, model, rows):
+    # Plain executemany; no per-row refresh, callers commit per batch.
+    # executemany needs uniform keys, so rows with and without ids are split.
+    groups = defaultdict(list)
+    for row in rows:
+        groups[frozenset(row)].append(row)
+    ids = []
+    for group in groups.values():
+        ids += db.execute(insert(model).returning(model.id), group).scalars().all()
+    changelog.record(db, model.__tablename__, ids)
+    if model is models.Client:
+        search.reindex_clients(db, ids)
+    if model is models.Pet:
+        owner_ids = [row.get("ownerId") for row in rows]
+        changelog.record(db, "clients", owner_ids)
+        search.reindex_clients(db, owner_ids)
+    if model is models.Product:
+        reorder.evaluate(db, ids)
+
+def bulk_insert_sales(db: Session, rows):
+    # Sales need their generated ids for the items, so they go through the
+    # unit of work, which still batches each table into one INSERT.
+    # Imported history is not checked against or deducted from stock.
+    sales = [
+        models.Sale(**{k: v for k, v in row.items() if k != "items"}, items=[models.SaleItem(**item) for item in row["items"]])
+        for row in rows
+    ]
+    db.add_all(sales)
+    db.flush()
+    rollups.add_sales(db, sales)
+    # History moves demand velocity, and with it the reorder points
+    reorder.evaluate(db, {item.product_id for sale in sales for item in sale.items})
+
+def iter_rows(db: Session, model, chunk_size: int = 1000):
+    stmt = select(model.__table__).order_by(model.id).execution_options(yield_per=chunk_size)
+    for chunk in db.execute(stmt).mappings().partitions():
+        yield chunk
+
+def iter_sales_with_items(db: Session, chunk_size: int = 1000):
+    stmt = select(models.Sale).order_by(models.Sale.id).execution_options(yield_per=chunk_size)
+    for chunk in db.execute(stmt).scalars().partitions():
+        _load_in_chunks(db, chunk, models.Sale.items)
+        yield chunk
+        db.expunge_all()
@@ -0,0 +1,61 @@
+from datetime import date
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+import crud, models
+
+# Async counterparts of the crud read functions. Simple lookups are written
+# against AsyncSession directly; list queries reuse the sync implementations
+# through run_sync, which drives them over the async driver without a
+# thread, so pagination and relationship loading stay defined in one place.
+
+async def get_client(db: AsyncSession, client_id: int):
+    return await db.run_sync(crud.get_client_with_pets, client_id)
+
+async def get_clients(db: AsyncSession, skip: int = 0, limit: int = 100, after: int = None, as_rows: bool = False):
+    return await db.run_sync(crud.get_clients, skip=skip, limit=limit, after=after, as_rows=as_rows)
+
+async def search_clients(db: AsyncSession, query: str, limit: int = 20):
+    return await db.run_sync(crud.search_clients, query, limit)
+
+async def get_pets(db: AsyncSession, skip: int = 0, limit: int = 100, after: int = None, as_rows: bool = False):
+    return await db.run_sync(crud.get_pets, skip=skip, limit=limit, after=after, as_rows=as_rows)
+
+async def get_appointments(db: AsyncSession, skip: int = 0, limit: int = 100, after: int = None, as_rows: bool = False, **filters):
+    return await db.run_sync(crud.get_appointments, skip=skip, limit=limit, after=after, as_rows=as_rows, **filters)
+
+async def get_appointment_counts_by_day(db: AsyncSession, start: date, end: date, **filters):
+    return await db.run_sync(crud.get_appointment_counts_by_day, start, end, **filters)
+
+async def get_products(db: AsyncSession, skip: int = 0, limit: int = 100, after: int = None, as_rows: bool = False):
+    return await db.run_sync(crud.get_products, skip=skip, limit=limit, after=after, as_rows=as_rows)
+
+async def get_product(db: AsyncSession, product_id: int):
+    return await db.get(models.Product, product_id)
+
+async def get_product_by_name(db: AsyncSession, name: str):
+    return (await db.execute(select(models.Product).where(models.Product.name == name))).scalars().first()
+
+async def get_services(db: AsyncSession, skip: int = 0, limit: int = 100, after: int = None, as_rows: bool = False):
+    return await db.run_sync(crud.get_services, skip=skip, limit=limit, after=after, as_rows=as_rows)
+
+async def get_service(db: AsyncSession, service_id: int):
+    return await db.get(models.Service, service_id)
+
+async def get_service_by_name(db: AsyncSession, name: str):
+    return (await db.execute(select(models.Service).where(models.Service.name == name))).scalars().first()
+
+async def get_sales(db: AsyncSession, skip: int = 0, limit: int = 100, after: tuple = None, as_rows: bool = False):
+    return await db.run_sync(crud.get_sales, skip=skip, limit=limit, after=after, as_rows=as_rows)
+
+async def get_sales_report(db: AsyncSession, start: date = None, end: date = None):
+    return await db.run_sync(crud.get_sales_report, start, end)
+
+async def get_reorder_list(db: AsyncSession):
+    return await db.run_sync(crud.get_reorder_list)
+
+async def get_sales_version(db: AsyncSession):
+    count, last_id = (await db.execute(select(func.count(models.Sale.id), func.max(models.Sale.id)))).one()
+    return (count, last_id)
+
+async def get_changes(db: AsyncSession, since: int = None, limit: int = 5000):
+    return await db.run_sync(crud.get_changes, since, limit)
@@ -1,12 +1,61 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from metrics import instrument_engine
+from settings import settings
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./sql_app.db"
+SQLALCHEMY_DATABASE_URL = settings.database_url
+ASYNC_DATABASE_URL = settings.async_database_url
+
+def _sqlite_profile(engine):
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # Let SQLAlchemy emit BEGIN itself (see below) so SAVEPOINTs and
+        # BEGIN IMMEDIATE behave; pysqlite's implicit transactions get both wrong
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+        cursor.execute(f"PRAGMA cache_size={settings.sqlite_cache_size}")
+        cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size}")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def begin_sqlite_transaction(conn):
+        # Writers ask for IMMEDIATE so they queue on busy_timeout up front
+        # instead of failing when a read transaction tries to upgrade
+        conn.exec_driver_sql(f"BEGIN {conn.get_execution_options().get('sqlite_begin', 'DEFERRED')}")
+
+def _engine_options(url: str):
+    options = {"pool_size": settings.db_pool_size, "max_overflow": settings.db_max_overflow}
+    if url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options["pool_pre_ping"] = True
+    return options
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL))
+if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
+    _sqlite_profile(engine)
+instrument_engine(engine)
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Sessions that write. A DEFERRED transaction that reads before it writes
+# can't upgrade to the write lock while another writer holds it, and in WAL
+# mode SQLite fails it at once instead of waiting out busy_timeout
+write_engine = engine.execution_options(sqlite_begin="IMMEDIATE")
+WriteSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=write_engine)
+
+# Async engine for the async def endpoints (aiosqlite locally, asyncpg on
+# Postgres). Same pool sizing and SQLite pragmas as the sync engine.
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL))
+if ASYNC_DATABASE_URL.startswith("sqlite"):
+    _sqlite_profile(async_engine.sync_engine)
+instrument_engine(async_engine.sync_engine)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
@@ -0,0 +1,35 @@
+from fastapi import Response
+from fastapi.responses import StreamingResponse
+from pydantic_core import to_json
+from database import SessionLocal
+from pagination import NEXT_CURSOR_HEADER, next_page
+
+try:
+    import orjson
+except ImportError:  # optional; pydantic-core's encoder is the fallback
+    orjson = None
+
+def dumps(value) -> bytes:
+    # Plain dicts/lists straight to bytes. Datetimes, dates and enums come out
+    # the same as the schemas would serialize them.
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_UTC_Z)
+    return to_json(value)
+
+def page_response(rows, limit: int, key=lambda row: [row["id"]]):
+    # page() for crud results fetched with as_rows=True
+    rows, cursor = next_page(rows, limit, key)
+    headers = {NEXT_CURSOR_HEADER: cursor} if cursor is not None else None
+    return Response(content=dumps(rows), media_type="application/json", headers=headers)
+
+def ndjson_response(chunks):
+    # chunks(db) yields lists of rows from a crud iter_* function; each chunk
+    # goes out as it is read, so memory stays bounded by the chunk size
+    def body():
+        db = SessionLocal()
+        try:
+            for chunk in chunks(db):
+                yield b"".join(dumps(row) + b"\n" for row in chunk)
+        finally:
+            db.close()
+    return StreamingResponse(body(), media_type="application/x-ndjson")
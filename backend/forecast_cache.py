@@ -0,0 +1,121 @@
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from sqlalchemy.orm import Session
+import crud
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+class ForecastCache:
+    # Keeps the last good forecast keyed on the sales data version and refits
+    # it on a background thread whenever that version moves.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._fit_lock = threading.Lock()
+        self._stale = threading.Event()
+        self._stopped = False
+        self._worker = None
+        self._result = None
+        self._version = None
+        self._generated_at = None
+
+    def mark_stale(self):
+        self._stale.set()
+        self._ensure_worker()
+
+    def serve(self, version):
+        # Returns the cached forecast without blocking, or None when nothing
+        # has been fitted yet
+        with self._lock:
+            result, cached_version, generated_at = self._result, self._version, self._generated_at
+        if result is None:
+            return None
+        if cached_version != version:
+            self.mark_stale()
+        return self._response(result, cached_version, generated_at, version)
+
+    def fit_now(self, version):
+        # Nothing to serve yet, so the first request pays for the fit
+        db = SessionLocal()
+        try:
+            result, cached_version, generated_at = self._refit(db, version)
+        finally:
+            db.close()
+        return self._response(result, cached_version, generated_at, version)
+
+    def _response(self, result, cached_version, generated_at, version):
+        return {
+            **result,
+            "generated_at": datetime.fromtimestamp(generated_at, timezone.utc).isoformat(),
+            "age_seconds": round(time.time() - generated_at, 3),
+            "stale": cached_version != version,
+        }
+
+    def _refit(self, db: Session, version):
+        with self._fit_lock:
+            with self._lock:
+                if self._result is not None and self._version == version:
+                    return self._result, self._version, self._generated_at
+            # pandas and the models load on the first fit, not at startup
+            import forecasting
+            result = forecasting.build_sales_forecast(db)
+            with self._lock:
+                if result.get("model") == "naive":
+                    if self._result is not None and self._version is not None:
+                        # Keep serving the last real fit; the next request retries
+                        return self._result, self._version, self._generated_at
+                    # A fallback is current for no version, so the next
+                    # request sees it as stale and refits
+                    version = None
+                self._result, self._version, self._generated_at = result, version, time.time()
+                return self._result, self._version, self._generated_at
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cached": self._result is not None,
+                "age_seconds": round(time.time() - self._generated_at, 3) if self._generated_at else None,
+                "refitting": self._fit_lock.locked(),
+            }
+
+    def stop(self, timeout: float = None):
+        # Lets an in-flight refit finish, then ends the background thread.
+        # The next mark_stale() starts a new one.
+        with self._lock:
+            self._stopped = True
+            worker = self._worker
+        self._stale.set()
+        if worker is not None:
+            worker.join(timeout)
+        with self._lock:
+            self._stopped = False
+            self._stale.clear()
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._stopped:
+                return
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="forecast-refit", daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            self._stale.wait()
+            self._stale.clear()
+            if self._stopped:
+                return
+            db = SessionLocal()
+            try:
+                version = crud.get_sales_version(db)
+                if version != self._version:
+                    self._refit(db, version)
+            except Exception:
+                logger.exception("Forecast refit failed")
+            finally:
+                db.close()
+
+forecast_cache = ForecastCache()
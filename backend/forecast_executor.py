@@ -0,0 +1,100 @@
+import hashlib
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from settings import settings
+
+class ForecastBusy(Exception):
+    pass
+
+def _timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+def fit_key(name: str, values) -> str:
+    # ndarray.tobytes() is always C order, so views and copies hash alike
+    return f"{name}:{hashlib.sha1(values.tobytes()).hexdigest()}"
+
+class ForecastExecutor:
+    # Bounded process pool for model fits. Concurrent calls with the same key
+    # share one fit instead of queueing duplicates.
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self._max_workers = max_workers
+        self._max_queue = max_queue
+        self._lock = threading.Lock()
+        self._pool = None
+        self._inflight = {}
+        self._durations = deque(maxlen=100)
+        self._submitted = 0
+        self._coalesced = 0
+        self._failed = 0
+
+    def run(self, key: str, fn, *args, timeout: float):
+        return self.submit(key, fn, *args).result(timeout=timeout)[0]
+
+    def submit(self, key: str, fn, *args):
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is None:
+                if len(self._inflight) >= self._max_workers + self._max_queue:
+                    raise ForecastBusy(f"{len(self._inflight)} forecast fits already pending")
+                future = self._get_pool().submit(_timed, fn, *args)
+                self._inflight[key] = future
+                self._submitted += 1
+                future.add_done_callback(lambda f: self._done(key, f))
+            else:
+                self._coalesced += 1
+            return future
+
+    def stats(self):
+        with self._lock:
+            durations = sorted(self._durations)
+            pending = len(self._inflight)
+            return {
+                "workers": self._max_workers,
+                "pending": pending,
+                "queue_depth": max(0, pending - self._max_workers),
+                "submitted": self._submitted,
+                "coalesced": self._coalesced,
+                "failed": self._failed,
+                "fit_seconds": {
+                    "count": len(durations),
+                    "last": self._durations[-1],
+                    "mean": sum(durations) / len(durations),
+                    "p95": durations[int(0.95 * (len(durations) - 1))],
+                } if durations else {"count": 0},
+            }
+
+    def shutdown(self):
+        # Stops the worker processes; a later fit starts a fresh pool
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self._max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def _done(self, key: str, future):
+        with self._lock:
+            self._inflight.pop(key, None)
+            if future.cancelled():
+                self._failed += 1
+            elif future.exception() is not None:
+                self._failed += 1
+                if isinstance(future.exception(), BrokenProcessPool):
+                    self._pool = None
+            else:
+                self._durations.append(future.result()[1])
+
+forecast_executor = ForecastExecutor(settings.forecast_workers, settings.forecast_max_queue)
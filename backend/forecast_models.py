@@ -0,0 +1,51 @@
+import numpy as np
+
+# Pure numeric models. They only take and return NumPy arrays so they can run
+# inside the forecasting process pool.
+
+def fit_arima(values, steps: int, order=(5, 1, 0)):
+    # statsmodels is only needed where fits run (the pool workers), and
+    # importing it costs about a second and tens of MB
+    from statsmodels.tsa.arima.model import ARIMA
+    model_fit = ARIMA(np.asarray(values, dtype=float), order=order).fit()
+    return np.asarray(model_fit.forecast(steps=steps))
+
+def naive_forecast(values, steps: int, window: int = 7):
+    values = np.asarray(values, dtype=float)
+    return np.full(steps, values[-window:].mean() if len(values) else 0.0)
+
+def exponential_smoothing(matrix, alpha: float = 0.2):
+    # Final simple-exponential-smoothing level of every column at once. The
+    # recursion unrolls into geometrically decaying weights over the rows.
+    n = matrix.shape[0]
+    weights = alpha * (1 - alpha) ** np.arange(n - 1, -1, -1)
+    weights[0] = (1 - alpha) ** (n - 1)
+    return weights @ matrix
+
+def croston(matrix, alpha: float = 0.1):
+    # Croston's method for intermittent demand, vectorized across columns:
+    # smooth demand sizes and inter-demand intervals separately and forecast
+    # their ratio as the per-period rate.
+    size = np.zeros(matrix.shape[1])
+    interval = np.zeros(matrix.shape[1])
+    since_last = np.ones(matrix.shape[1])
+    started = np.zeros(matrix.shape[1], dtype=bool)
+    for row in matrix:
+        demand = row > 0
+        first = demand & ~started
+        update = demand & started
+        size[first] = row[first]
+        interval[first] = since_last[first]
+        size[update] += alpha * (row[update] - size[update])
+        interval[update] += alpha * (since_last[update] - interval[update])
+        started |= demand
+        since_last = np.where(demand, 1.0, since_last + 1.0)
+    return np.where(started, size / np.maximum(interval, 1.0), 0.0)
+
+def demand_rates(matrix, intermittent_adi: float = 1.32):
+    # Columns whose average inter-demand interval exceeds the ADI cut-off are
+    # intermittent and go through Croston, the rest through smoothing.
+    nonzero = np.count_nonzero(matrix, axis=0)
+    intermittent = matrix.shape[0] / np.maximum(nonzero, 1) > intermittent_adi
+    rates = np.where(intermittent, croston(matrix), exponential_smoothing(matrix))
+    return np.maximum(rates, 0.0), intermittent
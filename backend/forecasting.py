@@ -0,0 +1,135 @@
+import logging
+from sqlalchemy.orm import Session
+import crud
+import numpy as np
+import pandas as pd
+import time
+from datetime import date, timedelta
+from forecast_executor import ForecastBusy, fit_key, forecast_executor
+from forecast_models import demand_rates, fit_arima, naive_forecast
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+def load_daily_sales(db: Session, lookback_days: int, chunk_size: int):
+    last_day = crud.get_last_sale_day(db)
+    if last_day is None:
+        return None
+
+    # The window ends at the most recent sale, so the series is a fixed-size
+    # array no matter how many sales fall inside it.
+    end = last_day
+    start = end - timedelta(days=lookback_days)
+    totals = np.zeros(lookback_days + 1)
+    seen = np.zeros(lookback_days + 1, dtype=bool)
+    for days, day_totals in crud.iter_daily_sales_totals(db, since=start, chunk_size=chunk_size):
+        offsets = (pd.DatetimeIndex(days) - pd.Timestamp(start)).days
+        totals[offsets] = day_totals
+        seen[offsets] = True
+
+    first = np.argmax(seen)
+    index = pd.date_range(start + timedelta(days=int(first)), end, freq='D')
+    return pd.Series(totals[first:], index=index)
+
+def load_product_demand(db: Session, start: date, end: date, chunk_size: int):
+    offsets, product_ids, quantities = [], [], []
+    for days, pids, day_quantities in crud.iter_daily_product_quantities(db, since=start, chunk_size=chunk_size):
+        offsets.append((pd.DatetimeIndex(days) - pd.Timestamp(start)).days.to_numpy())
+        product_ids.append(np.asarray(pids, dtype=np.int64))
+        quantities.append(np.asarray(day_quantities, dtype=float))
+
+    n_days = (end - start).days + 1
+    if not offsets:
+        return np.array([], dtype=np.int64), np.zeros((n_days, 0))
+
+    ids, columns = np.unique(np.concatenate(product_ids), return_inverse=True)
+    matrix = np.zeros((n_days, len(ids)))
+    matrix[np.concatenate(offsets), columns] = np.concatenate(quantities)
+    return ids, matrix
+
+def refine_with_arima(demand, columns, estimated, methods):
+    deadline = time.monotonic() + settings.forecast_timeout
+    futures = {}
+    for i in columns:
+        try:
+            futures[i] = forecast_executor.submit(fit_key("arima", demand[:, i]), fit_arima, demand[:, i], 30)
+        except ForecastBusy:
+            break
+
+    estimated, methods = estimated.copy(), methods.copy()
+    for i, future in futures.items():
+        try:
+            forecast, _ = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except Exception as e:
+            # Keep the vectorized estimate for this product
+            logger.warning("ARIMA fit failed for product column %s: %r", i, e)
+            continue
+        estimated[i] = np.clip(forecast, 0, None).sum()
+        methods[i] = "arima"
+    return estimated, methods
+
+def build_sales_forecast(db: Session):
+    series = load_daily_sales(db, settings.forecast_lookback_days, settings.forecast_chunk_size)
+    if series is None:
+        return {"message": "No sales data available for forecasting."}
+
+    if len(series) < 14:  # Need at least 2 weeks of data for a meaningful forecast
+        return {"message": "Não há dados de vendas suficientes para uma previsão confiável."}
+
+    # Fit a simple ARIMA model for total sales in the process pool, falling
+    # back to a naive forecast if the pool is saturated, too slow, or the fit
+    # itself fails
+    values = series.to_numpy()
+    model_name = "arima"
+    try:
+        forecast = forecast_executor.run(
+            fit_key("arima", values), fit_arima, values, 30, timeout=settings.forecast_timeout
+        )
+    except Exception as e:
+        logger.warning("ARIMA fit failed, using naive forecast: %r", e)
+        forecast = naive_forecast(values, 30)
+        model_name = "naive"
+
+    # Forecast unit demand for every product at once from a days x products
+    # quantity matrix; only the top sellers get their own ARIMA fit
+    product_ids, demand = load_product_demand(
+        db, series.index[0].date(), series.index[-1].date(), settings.forecast_chunk_size
+    )
+    if demand.sum() == 0:
+        return {"message": "No product sales data available for inventory suggestion."}
+
+    rates, intermittent = demand_rates(demand)
+    estimated = rates * 30
+    methods = np.where(intermittent, "croston", "ses").astype(object)
+    top_sellers = np.argsort(demand.sum(axis=0))[::-1][:settings.forecast_arima_top_n]
+    estimated, methods = refine_with_arima(demand, top_sellers[~intermittent[top_sellers]], estimated, methods)
+
+    # Compare estimated demand against current stock in one pass
+    stock_ids, names, stock = crud.get_product_stock_levels(db, product_ids.tolist())
+    positions = np.searchsorted(product_ids, stock_ids)
+    estimated, methods = estimated[positions], methods[positions]
+    stock = np.asarray(stock, dtype=float)
+    suggestions = [
+        {
+            "product_name": names[i],
+            "current_stock": int(stock[i]),
+            "estimated_sales_30_days": round(float(estimated[i])),
+            "method": methods[i],
+            "suggestion": f"Estoque recomendado: {round(float(estimated[i] - stock[i]))} unidades."
+        }
+        for i in np.flatnonzero(estimated > stock)
+    ]
+
+    # Prepare forecast data for response
+    forecast_dates = [series.index[-1] + timedelta(days=i) for i in range(1, 31)]
+    forecast_data = {
+        "forecast": [
+            {"date": date.strftime('%Y-%m-%d'), "predicted_sales": float(value)}
+            for date, value in zip(forecast_dates, forecast)
+        ],
+        "summary": "Previsão de vendas para os próximos 30 dias.",
+        "model": model_name,
+        "inventory_suggestions": suggestions
+    }
+
+    return forecast_data
@@ -0,0 +1,73 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from fastapi import HTTPException
+from pydantic import BaseModel
+from sqlalchemy import delete
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+import models
+from settings import settings
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotency-Replayed"
+MAX_KEY_LENGTH = 255
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _fingerprint(payload: BaseModel):
+    # Hash of the parsed request, so formatting differences between retries
+    # don't count as a different request
+    return hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+def _lookup(db: Session, scope: str, key: str, fingerprint: str):
+    stored = db.get(models.IdempotencyKey, (scope, key))
+    if stored is None:
+        return None
+    if stored.expires_at <= _now():
+        db.delete(stored)
+        db.flush()
+        return None
+    if stored.fingerprint != fingerprint:
+        raise HTTPException(status_code=422, detail=f"{HEADER} was already used for a different request")
+    return stored
+
+def run_once(db: Session, scope: str, key: str, payload: BaseModel, perform, schema):
+    # Runs perform() (which must not commit) and stores its response under
+    # the key in the same transaction. A retry with the key gets the stored
+    # response back instead of running it again. Returns (response, replayed).
+    fingerprint = _fingerprint(payload)
+    stored = _lookup(db, scope, key, fingerprint)
+    if stored is not None:
+        return schema.model_validate_json(stored.response), True
+
+    now = _now()
+    row = models.IdempotencyKey(
+        scope=scope, key=key, fingerprint=fingerprint, response="",
+        created_at=now, expires_at=now + timedelta(hours=settings.idempotency_key_ttl_hours),
+    )
+    try:
+        # Claim the key before doing the work. On SQLite, write sessions
+        # begin IMMEDIATE, so a concurrent duplicate waits for the first to
+        # commit and finds its key in _lookup above. On Postgres it blocks
+        # on this row until the first commits, then fails here and replays
+        # what the first stored.
+        with db.begin_nested():
+            db.add(row)
+    except IntegrityError:
+        stored = _lookup(db, scope, key, fingerprint)
+        if stored is None:
+            raise HTTPException(
+                status_code=409, detail=f"A request with this {HEADER} is still in progress", headers={"Retry-After": "1"},
+            )
+        return schema.model_validate_json(stored.response), True
+
+    response = perform()
+    row.response = response.model_dump_json()
+    db.commit()
+    return response, False
+
+def prune(engine: Engine):
+    with engine.begin() as conn:
+        conn.execute(delete(models.IdempotencyKey).where(models.IdempotencyKey.expires_at <= _now()))
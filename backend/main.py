@@ -1,12 +1,46 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from database import engine
-import models
-from routers import appointments, clients_pets, inventory, forecast
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.concurrency import run_in_threadpool
+from database import engine, write_engine
+import changelog, idempotency, metrics, migrations, reorder
+from forecast_cache import forecast_cache
+from forecast_executor import forecast_executor
+from pagination import NEXT_CURSOR_HEADER
+from routers import appointments, bulk, clients_pets, dashboard, inventory, forecast, sync
+from routers import metrics as metrics_router
+from settings import settings
 
-models.Base.metadata.create_all(bind=engine)
+logger = logging.getLogger(__name__)
 
-app = FastAPI()
+def startup():
+    # Runs per worker when it starts serving, not when main is imported
+    if settings.migrate_on_startup:
+        migrations.upgrade(engine)
+    changelog.prune(engine, settings.change_log_retention_days)
+    idempotency.prune(engine)
+    # Thresholds drift as the velocity window slides, even without sales;
+    # lifespan keeps re-evaluating them while the worker runs
+    reorder.refresh(write_engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await run_in_threadpool(startup)
+    reorder_refresh = asyncio.create_task(
+        reorder.refresh_periodically(write_engine, settings.reorder_refresh_minutes * 60)
+    )
+    yield
+    reorder_refresh.cancel()
+    with suppress(asyncio.CancelledError):
+        await reorder_refresh
+    # Both wait for in-flight fits, so keep them off the event loop
+    await run_in_threadpool(forecast_cache.stop)
+    await run_in_threadpool(forecast_executor.shutdown)
+
+app = FastAPI(lifespan=lifespan)
 
 origins = ["http://localhost:3000", "http://localhost:5173"]
 
@@ -16,9 +50,32 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
+    # Retry-After tells the POS which failed checkouts are worth retrying
+    expose_headers=[NEXT_CURSOR_HEADER, idempotency.REPLAYED_HEADER, "Retry-After"],
 )
 
+def add_compression(app: FastAPI):
+    # Responses under the threshold aren't worth the CPU
+    if settings.compression == "brotli":
+        try:
+            from brotli_asgi import BrotliMiddleware
+        except ImportError:
+            logger.warning("brotli-asgi is not installed, using gzip")
+        else:
+            app.add_middleware(BrotliMiddleware, minimum_size=settings.compression_minimum_size, gzip_fallback=True)
+            return
+    if settings.compression != "off":
+        app.add_middleware(GZipMiddleware, minimum_size=settings.compression_minimum_size, compresslevel=settings.gzip_level)
+
+add_compression(app)
+# Outermost, so the timings include compression
+app.add_middleware(metrics.MetricsMiddleware)
+
 app.include_router(appointments.router)
 app.include_router(clients_pets.router)
 app.include_router(inventory.router)
 app.include_router(forecast.router)
+app.include_router(dashboard.router)
+app.include_router(bulk.router)
+app.include_router(sync.router)
+app.include_router(metrics_router.router)
@@ -0,0 +1,153 @@
+import bisect
+import contextvars
+import logging
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+class Histogram:
+    # Cumulative-bucket histogram in the Prometheus text format, one series
+    # per label set. Small and dependency free; no prometheus_client needed.
+
+    def __init__(self, name: str, help: str, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect.bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def totals(self):
+        # {labels: (count, sum)}, for callers that want numbers, not text
+        with self._lock:
+            return {labels: (sum(counts), total) for labels, (counts, total) in self._series.items()}
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(labels, list(counts), total) for labels, (counts, total) in self._series.items()]
+        for labels, counts, total in sorted(series):
+            base = [f'{name}="{_escape(value)}"' for name, value in zip(self.labels, labels)]
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                bucket_labels = ",".join([*base, f'le="{bound}"'])
+                lines.append(f"{self.name}_bucket{{{bucket_labels}}} {cumulative}")
+            suffix = "{" + ",".join(base) + "}" if base else ""
+            lines.append(f"{self.name}_sum{suffix} {total}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+class Counter:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount: int = 1):
+        with self._lock:
+            self.value += amount
+
+    def render(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter", f"{self.name} {self.value}"]
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+request_latency = Histogram(
+    "vetsoft_http_request_duration_seconds", "Request latency by route.", ("method", "route", "status"),
+)
+request_queries = Histogram(
+    "vetsoft_db_queries_per_request", "SQL statements executed per request.", ("method", "route"), QUERY_COUNT_BUCKETS,
+)
+query_latency = Histogram("vetsoft_db_query_duration_seconds", "SQL statement execution time.")
+slow_queries = Counter("vetsoft_db_slow_queries_total", "Statements slower than SLOW_QUERY_MS.")
+
+# Per-request query counter. Context variables follow the request into
+# run_in_threadpool, run_sync and (see write_queue) the writer thread.
+_request_queries = contextvars.ContextVar("request_queries", default=None)
+
+class QueryCount:
+    def __init__(self):
+        self.value = 0
+        # Off for event streams, whose queries over a long connection belong
+        # to no single request
+        self.counting = True
+
+def render():
+    lines = []
+    for metric in (request_latency, request_queries, query_latency, slow_queries):
+        lines += metric.render()
+    return "\n".join(lines) + "\n"
+
+def instrument_engine(engine: Engine):
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    query_latency.observe(elapsed)
+    count = _request_queries.get()
+    if count is not None and count.counting:
+        count.value += 1
+    if elapsed * 1000 >= settings.slow_query_ms:
+        slow_queries.inc()
+        params = repr(parameters)
+        if len(params) > 500:
+            params = params[:500] + "..."
+        logger.warning("Slow query (%.1f ms): %s | params: %s", elapsed * 1000, " ".join(statement.split()), params)
+
+class MetricsMiddleware:
+    # Times every HTTP request and counts the SQL it caused, labelled by the
+    # route template (/clients/{client_id}) so ids don't explode the series.
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        count = QueryCount()
+        status = [500]
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                content_type = dict(message.get("headers", ())).get(b"content-type", b"")
+                if content_type.startswith(b"text/event-stream"):
+                    count.counting = False
+            await send(message)
+
+        token = _request_queries.set(count)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_queries.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            request_latency.observe(elapsed, scope["method"], path, str(status[0]))
+            if count.counting:
+                request_queries.observe(count.value, scope["method"], path)
+                if count.value > settings.max_queries_per_request:
+                    logger.warning("%s %s ran %d queries, possible N+1", scope["method"], path, count.value)
@@ -0,0 +1,98 @@
+import logging
+from datetime import date, datetime, timezone
+from sqlalchemy import bindparam, select, text
+from sqlalchemy.engine import Connection, Engine
+import models, reorder, rollups, search
+
+logger = logging.getLogger(__name__)
+
+def create_missing_indexes(engine: Engine):
+    # create_all skips tables that already exist, so indexes added to the
+    # models later have to be created on existing databases explicitly.
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+def _parse_utc(value: str):
+    # Sales are naive UTC; "...Z" and other offsets are converted
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+def _parse_wall_clock(value: str):
+    # Appointments are the clinic's wall-clock time; an offset is dropped,
+    # not applied
+    return datetime.fromisoformat(value).replace(tzinfo=None)
+
+def _parse_date(value: str):
+    return date.fromisoformat(value[:10])
+
+def _convert_column(conn: Connection, column, parse):
+    # Dates used to be stored as whatever ISO string the client sent
+    # ("...Z", naive, minutes only). Rewrite them through the column type so
+    # every row has the same storage format and compares correctly.
+    table = column.table
+    rows = conn.execute(text(f'SELECT id, "{column.name}" FROM {table.name} WHERE "{column.name}" IS NOT NULL')).all()
+    values = []
+    for id, raw in rows:
+        if not isinstance(raw, str):
+            continue
+        try:
+            values.append({"row_id": id, "value": parse(raw)})
+        except ValueError:
+            logger.warning("%s.%s: cannot parse %r (id %s), setting it to NULL", table.name, column.name, raw, id)
+            values.append({"row_id": id, "value": None})
+    if values:
+        conn.execute(
+            table.update().where(table.c.id == bindparam("row_id")).values({column.name: bindparam("value")}),
+            values,
+        )
+
+def _temporal_columns(conn: Connection):
+    _convert_column(conn, models.Appointment.__table__.c.date, _parse_wall_clock)
+    _convert_column(conn, models.Sale.__table__.c.date, _parse_utc)
+    _convert_column(conn, models.Pet.__table__.c.birthDate, _parse_date)
+
+def _reorder_points(conn: Connection):
+    # ix_product_sales_daily_product_day supersedes the single-column index
+    conn.execute(text("DROP INDEX IF EXISTS ix_product_sales_daily_product_id"))
+    reorder.rebuild(conn)
+
+# Data migrations run once each, in order, recorded in schema_migrations
+MIGRATIONS = [
+    ("0001_temporal_columns", _temporal_columns),
+    ("0002_sales_rollups", rollups.rebuild),
+    ("0003_reorder_points", _reorder_points),
+]
+
+def apply_migrations(engine: Engine):
+    table = models.SchemaMigration.__table__
+    with engine.begin() as conn:
+        applied = set(conn.execute(select(table.c.name)).scalars())
+        for name, migrate in MIGRATIONS:
+            if name in applied:
+                continue
+            migrate(conn)
+            conn.execute(table.insert().values(name=name, applied_at=datetime.now(timezone.utc).replace(tzinfo=None)))
+
+def seed_cache_versions(engine: Engine):
+    # One row per table up front, so concurrent writers only ever UPDATE
+    table = models.CacheVersion.__table__
+    with engine.begin() as conn:
+        existing = set(conn.execute(select(table.c.name)).scalars())
+        missing = [name for name in models.Base.metadata.tables if name not in existing]
+        if missing:
+            now = datetime.now(timezone.utc).replace(tzinfo=None)
+            conn.execute(table.insert(), [{"name": name, "version": 0, "updated_at": now} for name in missing])
+
+def upgrade(engine: Engine):
+    models.Base.metadata.create_all(bind=engine)
+    apply_migrations(engine)
+    create_missing_indexes(engine)
+    seed_cache_versions(engine)
+    search.create_index(engine)
+
+if __name__ == "__main__":
+    from database import engine
+    upgrade(engine)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum
+from sqlalchemy import Boolean, Column, Integer, String, Float, Date, DateTime, ForeignKey, Enum, Index
 from sqlalchemy.orm import relationship
 from database import Base
 import enum
@@ -26,8 +26,8 @@ class Pet(Base):
     name = Column(String, index=True)
     species = Column(String)
     breed = Column(String)
-    birthDate = Column(String)
-    ownerId = Column(Integer, ForeignKey("clients.id"))
+    birthDate = Column(Date)
+    ownerId = Column(Integer, ForeignKey("clients.id"), index=True)
 
     owner = relationship("Client", back_populates="pets")
 
@@ -35,13 +35,16 @@ class Appointment(Base):
     __tablename__ = "appointments"
 
     id = Column(Integer, primary_key=True, index=True)
-    clientId = Column(Integer, ForeignKey("clients.id"))
-    petId = Column(Integer, ForeignKey("pets.id"))
-    date = Column(String)
+    clientId = Column(Integer, ForeignKey("clients.id"), index=True)
+    petId = Column(Integer, ForeignKey("pets.id"), index=True)
+    date = Column(DateTime, index=True)
     reason = Column(String)
     notes = Column(String, nullable=True)
     status = Column(Enum(AppointmentStatus))
 
+    # "Upcoming scheduled" and per-status calendar views filter on both
+    __table_args__ = (Index("ix_appointments_status_date", "status", "date"),)
+
 class Product(Base):
     __tablename__ = "products"
 
@@ -64,16 +67,19 @@ class Sale(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     total = Column(Float)
-    date = Column(String)
+    # Naive UTC
+    date = Column(DateTime)
 
     items = relationship("SaleItem", back_populates="sale")
 
+    __table_args__ = (Index("ix_sales_date_id", "date", "id"),)
+
 class SaleItem(Base):
     __tablename__ = "sale_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    sale_id = Column(Integer, ForeignKey("sales.id"))
-    product_id = Column(Integer, ForeignKey("products.id"), nullable=True)
+    sale_id = Column(Integer, ForeignKey("sales.id"), index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=True, index=True)
     service_id = Column(Integer, ForeignKey("services.id"), nullable=True)
     quantity = Column(Integer)
     price = Column(Float)
@@ -81,3 +87,72 @@ class SaleItem(Base):
     sale = relationship("Sale", back_populates="items")
     product = relationship("Product")
     service = relationship("Service")
+
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+
+    name = Column(String, primary_key=True)
+    applied_at = Column(DateTime)
+
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+
+    name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime)
+
+class ChangeLog(Base):
+    __tablename__ = "change_log"
+
+    # The id doubles as the sync version, so it must never be reused
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String, nullable=False)
+    row_id = Column(Integer, nullable=False)
+    op = Column(String, nullable=False)
+    changed_at = Column(DateTime, nullable=False)
+
+    __table_args__ = {"sqlite_autoincrement": True}
+
+# Sales rollups, maintained by crud on every sale and rebuilt by rollups.py.
+# Days are UTC days, like Sale.date; units count products only.
+class SalesDaily(Base):
+    __tablename__ = "sales_daily"
+
+    day = Column(Date, primary_key=True)
+    revenue = Column(Float, nullable=False, default=0.0)
+    units = Column(Integer, nullable=False, default=0)
+    transactions = Column(Integer, nullable=False, default=0)
+
+class ProductSalesDaily(Base):
+    __tablename__ = "product_sales_daily"
+
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    revenue = Column(Float, nullable=False, default=0.0)
+    units = Column(Integer, nullable=False, default=0)
+    transactions = Column(Integer, nullable=False, default=0)
+
+    # One product's recent days, for demand velocity and per-product series
+    __table_args__ = (Index("ix_product_sales_daily_product_day", "product_id", "day"),)
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    # One row per (endpoint, client key), written in the transaction that
+    # performed the request, with the response a retry gets back
+    scope = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    fingerprint = Column(String, nullable=False)
+    response = Column(String, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+class ReorderPoint(Base):
+    __tablename__ = "reorder_points"
+
+    # Maintained by reorder.py whenever a product's stock changes
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    daily_velocity = Column(Float, nullable=False)
+    reorder_point = Column(Integer, nullable=False)
+    needs_reorder = Column(Boolean, nullable=False, index=True)
+    updated_at = Column(DateTime, nullable=False)
@@ -0,0 +1,48 @@
+import base64
+import json
+from datetime import datetime
+from fastapi import HTTPException, Response
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(values) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return values
+
+def after_id(cursor: str):
+    if cursor is None:
+        return None
+    (value,) = decode_cursor(cursor, 1)
+    if not isinstance(value, int):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    return value
+
+def sales_cursor(cursor: str):
+    # (date, id) of the last sale on the previous page
+    date, id = decode_cursor(cursor, 2)
+    try:
+        return datetime.fromisoformat(date), int(id)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+def next_page(rows, limit: int, key=lambda row: [row.id]):
+    # Callers fetch limit + 1 rows; the extra row only tells us there is a
+    # next page, and the last returned row becomes the cursor for it.
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(key(rows[-1]))
+    return rows, None
+
+def page(response: Response, rows, limit: int, key=lambda row: [row.id]):
+    rows, cursor = next_page(rows, limit, key)
+    if cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return rows
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+import math
+import threading
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import bindparam, delete, event, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+import cache, models
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Reorder points follow demand: a product needs reordering once its stock no
+# longer covers REORDER_COVER_DAYS of its recent daily sales, and never below
+# LOW_STOCK_THRESHOLD. Re-evaluated whenever stock changes, and for every
+# product at startup as the velocity window slides.
+
+def _now():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def _evaluation(stock: int, units: int):
+    velocity = (units or 0) / settings.reorder_velocity_days
+    point = max(settings.low_stock_threshold, math.ceil(velocity * settings.reorder_cover_days))
+    return {
+        "daily_velocity": velocity,
+        "reorder_point": point,
+        "needs_reorder": stock is not None and stock <= point,
+    }
+
+# Stock and units sold in the velocity window (from the rollup), one row per
+# product; built once, like the upserts below
+_product, _daily = models.Product, models.ProductSalesDaily
+_stock_and_units = (
+    select(_product.id, _product.stock, func.sum(_daily.units))
+    .outerjoin(_daily, (_daily.product_id == _product.id) & (_daily.day > bindparam("since")))
+    .group_by(_product.id, _product.stock)
+)
+_stock_and_units_of = _stock_and_units.where(_product.id.in_(bindparam("product_ids", expanding=True)))
+
+def _since():
+    return _now().date() - timedelta(days=settings.reorder_velocity_days)
+
+_upserts = {}
+
+def _upsert(db: Session, rows):
+    name = db.get_bind().dialect.name
+    stmt = _upserts.get(name)
+    if stmt is None:
+        table = models.ReorderPoint.__table__
+        stmt = (postgresql if name == "postgresql" else sqlite).insert(table)
+        stmt = _upserts[name] = stmt.on_conflict_do_update(
+            index_elements=["product_id"],
+            set_={column: stmt.excluded[column] for column in ("daily_velocity", "reorder_point", "needs_reorder", "updated_at")},
+        )
+    db.execute(stmt, rows)
+
+def evaluate(db: Session, product_ids):
+    # Re-evaluates the given products inside the caller's transaction; call
+    # it after anything that changes Product.stock
+    product_ids = sorted({id for id in product_ids if id is not None})
+    if not product_ids:
+        return
+    now = _now()
+    rows = [
+        {"product_id": id, **_evaluation(stock, units), "updated_at": now}
+        for id, stock, units in db.execute(_stock_and_units_of, {"since": _since(), "product_ids": product_ids})
+    ]
+    if rows:
+        _upsert(db, rows)
+    db.info["reorder_changed"] = True
+
+def forget(db: Session, product_id: int):
+    db.execute(delete(models.ReorderPoint).where(models.ReorderPoint.product_id == product_id))
+    db.info["reorder_changed"] = True
+
+def rebuild(conn: Connection):
+    now = _now()
+    rows = [
+        {"product_id": id, **_evaluation(stock, units), "updated_at": now}
+        for id, stock, units in conn.execute(_stock_and_units, {"since": _since()})
+    ]
+    table = models.ReorderPoint.__table__
+    conn.execute(delete(table))
+    if rows:
+        conn.execute(table.insert(), rows)
+    logger.info("Evaluated reorder points for %d products, %d need reordering", len(rows), sum(r["needs_reorder"] for r in rows))
+
+def refresh(engine: Engine):
+    with engine.begin() as conn:
+        rebuild(conn)
+    # Core writes skip the session hooks that invalidate caches and notify
+    cache.invalidate_tables({models.ReorderPoint.__tablename__})
+    notifier.notify()
+
+async def refresh_periodically(engine: Engine, interval: float):
+    # Sales age out of the velocity window without any write to notice it.
+    # Runs until cancelled.
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await run_in_threadpool(refresh, engine)
+        except Exception:
+            logger.exception("Reorder point refresh failed")
+
+class Notifier:
+    # Wakes the /inventory/reorder/events streams of this process when a
+    # commit touched reorder points. Workers don't see each other's commits,
+    # so streams also re-check on a timer.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+
+    def subscribe(self):
+        subscriber = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def notify(self):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, changed in subscribers:
+            loop.call_soon_threadsafe(changed.set)
+
+notifier = Notifier()
+
+# SAVEPOINTs fire these too; only the outermost commit makes the change
+# visible to the streams
+@event.listens_for(Session, "after_commit")
+def _notify_committed(session):
+    if session.in_nested_transaction():
+        return
+    if session.info.pop("reorder_changed", False):
+        notifier.notify()
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session):
+    if session.in_nested_transaction():
+        return
+    session.info.pop("reorder_changed", None)
+
+if __name__ == "__main__":
+    # python reorder.py: re-evaluate every product
+    from database import engine
+    logging.basicConfig(level=logging.INFO)
+    with engine.begin() as conn:
+        rebuild(conn)
@@ -0,0 +1,107 @@
+import logging
+from collections import defaultdict
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+import models
+
+logger = logging.getLogger(__name__)
+
+# Built once per table and dialect; constructing the ON CONFLICT clause
+# costs more than running it
+_upserts = {}
+
+def _upsert(db: Session, model, keys, rows):
+    # Adds the counters onto existing rows; SQLite and Postgres share the syntax
+    name = db.get_bind().dialect.name
+    stmt = _upserts.get((model, name))
+    if stmt is None:
+        table = model.__table__
+        stmt = (postgresql if name == "postgresql" else sqlite).insert(table)
+        stmt = _upserts[(model, name)] = stmt.on_conflict_do_update(
+            index_elements=keys,
+            set_={column: table.c[column] + stmt.excluded[column] for column in ("revenue", "units", "transactions")},
+        )
+    db.execute(stmt, rows)
+
+def add_sales(db: Session, sales):
+    # Folds flushed sales (with their items) into both rollups inside the
+    # caller's transaction, so they commit or roll back with the sales.
+    days = defaultdict(lambda: {"revenue": 0.0, "units": 0, "transactions": 0})
+    products = defaultdict(lambda: {"revenue": 0.0, "units": 0, "transactions": 0})
+    for sale in sales:
+        if sale.date is None:
+            continue
+        day = sale.date.date()
+        totals = days[day]
+        totals["revenue"] += sale.total or 0.0
+        totals["transactions"] += 1
+        seen = set()
+        for item in sale.items:
+            if item.product_id is None:
+                continue
+            row = products[(day, item.product_id)]
+            row["revenue"] += item.price * item.quantity
+            row["units"] += item.quantity
+            totals["units"] += item.quantity
+            if item.product_id not in seen:
+                row["transactions"] += 1
+                seen.add(item.product_id)
+    if days:
+        _upsert(db, models.SalesDaily, ["day"], [{"day": day, **totals} for day, totals in days.items()])
+    if products:
+        _upsert(db, models.ProductSalesDaily, ["day", "product_id"], [
+            {"day": day, "product_id": product_id, **totals} for (day, product_id), totals in products.items()
+        ])
+
+def rebuild(conn: Connection):
+    # Recomputes both rollups from sales/sale_items, for backfills and after
+    # writes that went around crud
+    sale, item = models.Sale, models.SaleItem
+    day = func.date(sale.date)
+    product_units = (
+        select(item.sale_id, func.sum(item.quantity).label("units"))
+        .where(item.product_id.isnot(None))
+        .group_by(item.sale_id)
+        .subquery()
+    )
+    daily = models.SalesDaily.__table__
+    product_daily = models.ProductSalesDaily.__table__
+
+    conn.execute(delete(daily))
+    conn.execute(daily.insert().from_select(
+        ["day", "revenue", "units", "transactions"],
+        select(
+            day,
+            func.coalesce(func.sum(sale.total), 0.0),
+            func.coalesce(func.sum(product_units.c.units), 0),
+            func.count(sale.id),
+        )
+        .outerjoin(product_units, product_units.c.sale_id == sale.id)
+        .where(sale.date.isnot(None))
+        .group_by(day),
+    ))
+    conn.execute(delete(product_daily))
+    conn.execute(product_daily.insert().from_select(
+        ["day", "product_id", "revenue", "units", "transactions"],
+        select(
+            day,
+            item.product_id,
+            func.coalesce(func.sum(item.price * item.quantity), 0.0),
+            func.sum(item.quantity),
+            func.count(func.distinct(item.sale_id)),
+        )
+        .join(sale, sale.id == item.sale_id)
+        .where(item.product_id.isnot(None), sale.date.isnot(None))
+        .group_by(day, item.product_id),
+    ))
+    counts = [conn.execute(select(func.count()).select_from(table)).scalar() for table in (daily, product_daily)]
+    logger.info("Rebuilt sales rollups: %d days, %d day x product rows", *counts)
+
+if __name__ == "__main__":
+    # python rollups.py: backfill after importing data straight into the tables
+    from database import engine
+    logging.basicConfig(level=logging.INFO)
+    with engine.begin() as conn:
+        rebuild(conn)
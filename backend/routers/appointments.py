@@ -1,30 +1,81 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-import crud, models, schemas
-from database import SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date, datetime, timedelta
+import calendar
+import crud, crud_async, models, schemas
+from database import AsyncSessionLocal
+from fast_json import ndjson_response, page_response
+from pagination import after_id, page
+from settings import settings
+from write_queue import write_queue
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 @router.post("/appointments/", response_model=schemas.Appointment)
-def create_appointment(appointment: schemas.AppointmentCreate, db: Session = Depends(get_db)):
-    return crud.create_appointment(db=db, appointment=appointment)
+async def create_appointment(appointment: schemas.AppointmentCreate):
+    return await write_queue.run_async(lambda db: crud.create_appointment(db=db, appointment=appointment), schemas.Appointment)
 
 @router.get("/appointments/", response_model=List[schemas.Appointment])
-def read_appointments(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    appointments = crud.get_appointments(db, skip=skip, limit=limit)
-    return appointments
+async def read_appointments(
+    response: Response,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[str] = None,
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    status: Optional[models.AppointmentStatus] = None,
+    clientId: Optional[int] = None,
+    petId: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    # `from` is inclusive and `to` exclusive, both in clinic wall-clock time
+    appointments = await crud_async.get_appointments(
+        db, skip=skip, limit=limit + 1, after=after_id(after), as_rows=settings.fast_json,
+        date_from=date_from, date_to=date_to, status=status, client_id=clientId, pet_id=petId,
+    )
+    if settings.fast_json:
+        return page_response(appointments, limit)
+    return page(response, appointments, limit)
+
+@router.get("/appointments/stream", response_model=List[schemas.Appointment])
+def stream_appointments(
+    date_from: Optional[datetime] = Query(None, alias="from"),
+    date_to: Optional[datetime] = Query(None, alias="to"),
+    status: Optional[models.AppointmentStatus] = None,
+    clientId: Optional[int] = None,
+    petId: Optional[int] = None,
+):
+    # Same filters as the list, every match as NDJSON
+    filters = dict(date_from=date_from, date_to=date_to, status=status, client_id=clientId, pet_id=petId)
+    return ndjson_response(lambda db: crud.iter_appointments(db, chunk_size=settings.stream_chunk_size, **filters))
+
+@router.get("/appointments/calendar", response_model=List[schemas.DailyCount])
+async def read_appointment_calendar(
+    year: int = Query(..., ge=1900, le=2999),
+    month: int = Query(..., ge=1, le=12),
+    status: Optional[models.AppointmentStatus] = None,
+    clientId: Optional[int] = None,
+    petId: Optional[int] = None,
+    db: AsyncSession = Depends(get_db),
+):
+    start = date(year, month, 1)
+    days = [start + timedelta(days=i) for i in range(calendar.monthrange(year, month)[1])]
+    per_day = await crud_async.get_appointment_counts_by_day(
+        db, start, days[-1] + timedelta(days=1), status=status, client_id=clientId, pet_id=petId,
+    )
+    return [{"date": day.isoformat(), "count": per_day.get(day.isoformat(), 0)} for day in days]
 
 @router.put("/appointments/{appointment_id}/status", response_model=schemas.Appointment)
-def update_appointment_status(appointment_id: int, status_update: schemas.AppointmentStatusUpdate, db: Session = Depends(get_db)):
-    db_appointment = crud.update_appointment_status(db, appointment_id=appointment_id, status=status_update.status)
+async def update_appointment_status(appointment_id: int, status_update: schemas.AppointmentStatusUpdate):
+    db_appointment = await write_queue.run_async(
+        lambda db: crud.update_appointment_status(db, appointment_id=appointment_id, status=status_update.status),
+        schemas.Appointment,
+    )
     if db_appointment is None:
         raise HTTPException(status_code=404, detail="Appointment not found")
     return db_appointment
@@ -0,0 +1,168 @@
+from fastapi import APIRouter, Depends, File, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from typing import Optional
+from datetime import date
+import csv
+import io
+import json
+import crud, models, schemas
+from database import SessionLocal, WriteSessionLocal
+
+router = APIRouter()
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+ENTITIES = {
+    schemas.BulkEntity.CLIENTS: (models.Client, schemas.ClientCreate, schemas.Client),
+    schemas.BulkEntity.PETS: (models.Pet, schemas.PetCreate, schemas.Pet),
+    schemas.BulkEntity.PRODUCTS: (models.Product, schemas.ProductCreate, schemas.Product),
+    schemas.BulkEntity.SALES: (models.Sale, schemas.SaleCreate, schemas.Sale),
+}
+
+def get_db():
+    # Only the import uses it; exports open their own read session
+    db = WriteSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def _guess_format(upload: UploadFile, format: Optional[schemas.BulkFormat]):
+    if format is not None:
+        return format
+    if (upload.filename or "").lower().endswith(".csv") or upload.content_type == "text/csv":
+        return schemas.BulkFormat.CSV
+    return schemas.BulkFormat.NDJSON
+
+def _parse(line_number: int, parse, value):
+    try:
+        return line_number, parse(value)
+    except ValueError as e:
+        return line_number, e
+
+def _read_rows(upload: UploadFile, format: schemas.BulkFormat):
+    # Yields (line number, raw row or parse error) without reading the whole
+    # upload into memory
+    text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    if format == schemas.BulkFormat.CSV:
+        reader = csv.DictReader(text)
+        for row in reader:
+            row = {k: v for k, v in row.items() if v != ""}
+            if "items" in row:
+                yield _parse(reader.line_num, lambda row: {**row, "items": json.loads(row["items"])}, row)
+            else:
+                yield reader.line_num, row
+    else:
+        for line_number, line in enumerate(text, start=1):
+            if line.strip():
+                yield _parse(line_number, json.loads, line)
+
+def _describe(error: ValidationError):
+    return "; ".join(f"{'.'.join(map(str, e['loc'])) or 'row'}: {e['msg']}" for e in error.errors())
+
+def _to_values(raw, create_schema):
+    values = create_schema.model_validate(raw).model_dump()
+    # Keep legacy ids when given so references between files survive
+    if raw.get("id") is not None:
+        values["id"] = int(raw["id"])
+    return values
+
+def _write_batch(db: Session, model, batch, report):
+    insert = crud.bulk_insert_sales if model is models.Sale else lambda db, rows: crud.bulk_insert(db, model, rows)
+    try:
+        insert(db, [values for _, values in batch])
+        db.commit()
+        report["inserted"] += len(batch)
+        return
+    except IntegrityError:
+        db.rollback()
+
+    # Something in the batch conflicts; replay it row by row so only the
+    # offending rows are rejected
+    for line, values in batch:
+        try:
+            with db.begin_nested():
+                insert(db, [values])
+            report["inserted"] += 1
+        except IntegrityError as e:
+            _reject(report, line, str(e.orig))
+    db.commit()
+
+def _reject(report, line: int, error: str):
+    report["failed"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"line": line, "error": error})
+
+@router.post("/bulk/{entity}/import", response_model=schemas.BulkImportReport)
+def import_rows(entity: schemas.BulkEntity, file: UploadFile = File(...), format: Optional[schemas.BulkFormat] = None, db: Session = Depends(get_db)):
+    model, create_schema, _ = ENTITIES[entity]
+    report = {"inserted": 0, "failed": 0, "errors": []}
+    batch = []
+    try:
+        for line, raw in _read_rows(file, _guess_format(file, format)):
+            if isinstance(raw, ValueError):
+                _reject(report, line, f"Unreadable row: {raw}")
+                continue
+            try:
+                batch.append((line, _to_values(raw, create_schema)))
+            except ValidationError as e:
+                _reject(report, line, _describe(e))
+                continue
+            except (ValueError, TypeError, AttributeError) as e:
+                _reject(report, line, str(e))
+                continue
+            if len(batch) >= BATCH_SIZE:
+                _write_batch(db, model, batch, report)
+                batch = []
+    except (csv.Error, UnicodeDecodeError) as e:
+        # The reader can't resume past a broken CSV record or encoding
+        _reject(report, 0, f"Unreadable input, import stopped: {e}")
+    if batch:
+        _write_batch(db, model, batch, report)
+    return report
+
+def _plain(row):
+    return {k: v.isoformat() if isinstance(v, date) else v for k, v in row.items()}
+
+def _export_rows(entity: schemas.BulkEntity, format: schemas.BulkFormat):
+    model, _, read_schema = ENTITIES[entity]
+    db = SessionLocal()
+    try:
+        if model is models.Sale:
+            chunks = ([read_schema.model_validate(sale, from_attributes=True).model_dump(mode="json") for sale in chunk] for chunk in crud.iter_sales_with_items(db))
+        else:
+            chunks = ([_plain(row) for row in chunk] for chunk in crud.iter_rows(db, model))
+
+        if format == schemas.BulkFormat.NDJSON:
+            for chunk in chunks:
+                yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in chunk)
+            return
+
+        buffer = io.StringIO()
+        writer = None
+        for chunk in chunks:
+            for row in chunk:
+                if "items" in row:
+                    row["items"] = json.dumps(row["items"])
+                if writer is None:
+                    writer = csv.DictWriter(buffer, fieldnames=list(row))
+                    writer.writeheader()
+                writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    finally:
+        db.close()
+
+@router.get("/bulk/{entity}/export")
+def export_rows(entity: schemas.BulkEntity, format: schemas.BulkFormat = schemas.BulkFormat.NDJSON):
+    media_type = "text/csv" if format == schemas.BulkFormat.CSV else "application/x-ndjson"
+    return StreamingResponse(
+        _export_rows(entity, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{entity.value}.{format.value}"'},
+    )
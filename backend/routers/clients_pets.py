@@ -1,46 +1,65 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-import crud, models, schemas
-from database import SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+import crud, crud_async, models, schemas
+from database import AsyncSessionLocal
+from fast_json import ndjson_response, page_response
+from pagination import after_id, page
+from settings import settings
+from write_queue import write_queue
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 @router.post("/clients/", response_model=schemas.Client)
-def create_client(client: schemas.ClientCreate, db: Session = Depends(get_db)):
-    return crud.create_client(db=db, client=client)
+async def create_client(client: schemas.ClientCreate):
+    return await write_queue.run_async(lambda db: crud.create_client(db=db, client=client), schemas.Client)
 
 @router.get("/clients/", response_model=List[schemas.Client])
-def read_clients(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    clients = crud.get_clients(db, skip=skip, limit=limit)
-    return clients
+async def read_clients(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    clients = await crud_async.get_clients(db, skip=skip, limit=limit + 1, after=after_id(after), as_rows=settings.fast_json)
+    if settings.fast_json:
+        return page_response(clients, limit)
+    return page(response, clients, limit)
+
+@router.get("/clients/stream", response_model=List[schemas.Client])
+def stream_clients():
+    # Every client as NDJSON, one object per line
+    return ndjson_response(lambda db: crud.iter_clients(db, chunk_size=settings.stream_chunk_size))
+
+@router.get("/clients/search", response_model=List[schemas.Client])
+async def search_clients(q: str = Query(..., min_length=1, max_length=200), limit: int = Query(20, ge=1, le=100), db: AsyncSession = Depends(get_db)):
+    # Ranked by relevance over client name, email, phone and pet names
+    return await crud_async.search_clients(db, query=q, limit=limit)
 
 @router.get("/clients/{client_id}", response_model=schemas.Client)
-def read_client(client_id: int, db: Session = Depends(get_db)):
-    db_client = crud.get_client(db, client_id=client_id)
+async def read_client(client_id: int, db: AsyncSession = Depends(get_db)):
+    db_client = await crud_async.get_client(db, client_id=client_id)
     if db_client is None:
         raise HTTPException(status_code=404, detail="Client not found")
     return db_client
 
 @router.post("/pets/", response_model=schemas.Pet)
-def create_pet(pet: schemas.PetCreate, db: Session = Depends(get_db)):
-    return crud.create_pet(db=db, pet=pet)
+async def create_pet(pet: schemas.PetCreate):
+    return await write_queue.run_async(lambda db: crud.create_pet(db=db, pet=pet), schemas.Pet)
 
 @router.get("/pets/", response_model=List[schemas.Pet])
-def read_pets(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    pets = crud.get_pets(db, skip=skip, limit=limit)
-    return pets
+async def read_pets(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    pets = await crud_async.get_pets(db, skip=skip, limit=limit + 1, after=after_id(after), as_rows=settings.fast_json)
+    if settings.fast_json:
+        return page_response(pets, limit)
+    return page(response, pets, limit)
+
+@router.get("/pets/stream", response_model=List[schemas.Pet])
+def stream_pets():
+    return ndjson_response(lambda db: crud.iter_pets(db, chunk_size=settings.stream_chunk_size))
 
 @router.delete("/pets/{pet_id}", response_model=schemas.Pet)
-def delete_pet(pet_id: int, db: Session = Depends(get_db)):
-    db_pet = crud.delete_pet(db, pet_id=pet_id)
+async def delete_pet(pet_id: int):
+    db_pet = await write_queue.run_async(lambda db: crud.delete_pet(db, pet_id=pet_id), schemas.Pet)
     if db_pet is None:
         raise HTTPException(status_code=404, detail="Pet not found")
     return db_pet
@@ -1 +1,35 @@
-~&}-j+
\ No newline at end of file
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+import crud, schemas
+from cache import TTLCache
+from database import SessionLocal
+from settings import settings
+
+router = APIRouter()
+
+summary_cache = TTLCache(
+    settings.dashboard_cache_ttl,
+    tables={"clients", "pets", "appointments", "sales", "sales_daily", "reorder_points"},
+)
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def build_summary(db: Session):
+    now = datetime.now()
+    today = now.date()
+    week = [today + timedelta(days=i) for i in range(7)]
+    counts = crud.get_dashboard_counts(db, now=now)
+    per_day = crud.get_appointment_counts_by_day(db, start=week[0], end=week[-1] + timedelta(days=1))
+    weekly = [{"date": day.isoformat(), "count": per_day.get(day.isoformat(), 0)} for day in week]
+    return {**counts, "today_appointments": weekly[0]["count"], "weekly_appointments": weekly}
+
+@router.get("/dashboard/summary", response_model=schemas.DashboardSummary)
+def read_dashboard_summary(db: Session = Depends(get_db)):
+    # Keyed on the minute so "upcoming" and "today" roll over with the clock
+    return summary_cache.get_or_set(datetime.now().strftime("%Y-%m-%dT%H:%M"), lambda: build_summary(db))
@@ -1,75 +1,164 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-import crud, schemas
-from database import SessionLocal
+import asyncio
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from datetime import date
+import crud, crud_async, idempotency, reorder, schemas
+from cache import ConditionalCache
+from database import AsyncSessionLocal
+from fast_json import ndjson_response, page_response
+from pagination import NEXT_CURSOR_HEADER, after_id, next_page, page, sales_cursor
+from settings import settings
+from forecast_cache import forecast_cache
+from write_queue import write_queue
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
+# Every POS screen polls the catalog, which rarely changes
+_shared = settings.catalog_cache_backend == "database"
+product_cache = ConditionalCache("products", _shared, settings.catalog_cache_max_entries, settings.catalog_cache_ttl)
+service_cache = ConditionalCache("services", _shared, settings.catalog_cache_max_entries, settings.catalog_cache_ttl)
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+async def _catalog_page(load, schema, limit: int):
+    rows, cursor = next_page(await load(limit + 1), limit)
+    body = TypeAdapter(List[schema]).dump_json([schema.model_validate(row, from_attributes=True) for row in rows])
+    return body, {NEXT_CURSOR_HEADER: cursor} if cursor is not None else {}
 
 @router.get("/inventory/products", response_model=List[schemas.Product])
-def read_products(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    products = crud.get_products(db, skip=skip, limit=limit)
-    return products
+async def read_products(request: Request, skip: int = 0, limit: int = 100, after: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    after = after_id(after)
+    load = lambda size: crud_async.get_products(db, skip=skip, limit=size, after=after)
+    return await product_cache.respond(request, db, (skip, limit, after), lambda: _catalog_page(load, schemas.Product, limit))
 
 @router.post("/inventory/products", response_model=schemas.Product)
-def create_product(product: schemas.ProductCreate, db: Session = Depends(get_db)):
-    db_product = crud.get_product_by_name(db, name=product.name)
+async def create_product(product: schemas.ProductCreate, db: AsyncSession = Depends(get_db)):
+    db_product = await crud_async.get_product_by_name(db, name=product.name)
     if db_product:
         raise HTTPException(status_code=400, detail="Product with this name already registered")
-    return crud.create_product(db=db, product=product)
+    return await write_queue.run_async(lambda db: crud.create_product(db=db, product=product), schemas.Product)
 
 @router.put("/inventory/products/{product_id}", response_model=schemas.Product)
-def update_product(product_id: int, product: schemas.ProductUpdate, db: Session = Depends(get_db)):
-    db_product = crud.get_product(db, product_id=product_id)
+async def update_product(product_id: int, product: schemas.ProductUpdate, db: AsyncSession = Depends(get_db)):
+    db_product = await crud_async.get_product(db, product_id=product_id)
     if db_product is None:
         raise HTTPException(status_code=404, detail="Product not found")
-    return crud.update_product(db=db, product_id=product_id, product=product)
+    return await write_queue.run_async(lambda db: crud.update_product(db=db, product_id=product_id, product=product), schemas.Product)
 
 @router.delete("/inventory/products/{product_id}", response_model=schemas.Product)
-def delete_product(product_id: int, db: Session = Depends(get_db)):
-    db_product = crud.get_product(db, product_id=product_id)
+async def delete_product(product_id: int, db: AsyncSession = Depends(get_db)):
+    db_product = await crud_async.get_product(db, product_id=product_id)
     if db_product is None:
         raise HTTPException(status_code=404, detail="Product not found")
-    return crud.delete_product(db=db, product_id=product_id)
+    return await write_queue.run_async(lambda db: crud.delete_product(db=db, product_id=product_id), schemas.Product)
+
+_reorder_list = TypeAdapter(List[schemas.ReorderItem])
+
+@router.get("/inventory/reorder", response_model=List[schemas.ReorderItem])
+async def read_reorder_list(db: AsyncSession = Depends(get_db)):
+    # Products at or below their reorder point, least stock cover first
+    return await crud_async.get_reorder_list(db)
+
+@router.get("/inventory/reorder/events", response_class=StreamingResponse)
+async def reorder_events(request: Request):
+    # Server-sent events: the reorder list on connect and again whenever it
+    # changes. Commits in this process wake the stream; the timer catches
+    # writes from other workers and keeps proxies from closing an idle stream.
+    async def events():
+        subscriber = reorder.notifier.subscribe()
+        _, changed = subscriber
+        last = None
+        try:
+            while not await request.is_disconnected():
+                changed.clear()
+                async with AsyncSessionLocal() as db:
+                    body = _reorder_list.dump_json(_reorder_list.validate_python(await crud_async.get_reorder_list(db)))
+                if body != last:
+                    last = body
+                    yield b"event: reorder\ndata: " + body + b"\n\n"
+                else:
+                    yield b": keepalive\n\n"
+                try:
+                    await asyncio.wait_for(changed.wait(), settings.reorder_events_poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            reorder.notifier.unsubscribe(subscriber)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        # nginx would otherwise hold events back in its buffer
+        "X-Accel-Buffering": "no",
+    })
 
 @router.get("/inventory/services", response_model=List[schemas.Service])
-def read_services(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    services = crud.get_services(db, skip=skip, limit=limit)
-    return services
+async def read_services(request: Request, skip: int = 0, limit: int = 100, after: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    after = after_id(after)
+    load = lambda size: crud_async.get_services(db, skip=skip, limit=size, after=after)
+    return await service_cache.respond(request, db, (skip, limit, after), lambda: _catalog_page(load, schemas.Service, limit))
 
 @router.post("/inventory/services", response_model=schemas.Service)
-def create_service(service: schemas.ServiceCreate, db: Session = Depends(get_db)):
-    db_service = crud.get_service_by_name(db, name=service.name)
+async def create_service(service: schemas.ServiceCreate, db: AsyncSession = Depends(get_db)):
+    db_service = await crud_async.get_service_by_name(db, name=service.name)
     if db_service:
         raise HTTPException(status_code=400, detail="Service with this name already registered")
-    return crud.create_service(db=db, service=service)
+    return await write_queue.run_async(lambda db: crud.create_service(db=db, service=service), schemas.Service)
 
 @router.put("/inventory/services/{service_id}", response_model=schemas.Service)
-def update_service(service_id: int, service: schemas.ServiceUpdate, db: Session = Depends(get_db)):
-    db_service = crud.get_service(db, service_id=service_id)
+async def update_service(service_id: int, service: schemas.ServiceUpdate, db: AsyncSession = Depends(get_db)):
+    db_service = await crud_async.get_service(db, service_id=service_id)
     if db_service is None:
         raise HTTPException(status_code=404, detail="Service not found")
-    return crud.update_service(db=db, service_id=service_id, service=service)
+    return await write_queue.run_async(lambda db: crud.update_service(db=db, service_id=service_id, service=service), schemas.Service)
 
 @router.delete("/inventory/services/{service_id}", response_model=schemas.Service)
-def delete_service(service_id: int, db: Session = Depends(get_db)):
-    db_service = crud.get_service(db, service_id=service_id)
+async def delete_service(service_id: int, db: AsyncSession = Depends(get_db)):
+    db_service = await crud_async.get_service(db, service_id=service_id)
     if db_service is None:
         raise HTTPException(status_code=404, detail="Service not found")
-    return crud.delete_service(db=db, service_id=service_id)
+    return await write_queue.run_async(lambda db: crud.delete_service(db=db, service_id=service_id), schemas.Service)
 
 @router.get("/inventory/sales", response_model=List[schemas.Sale])
-def read_sales(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    sales = crud.get_sales(db, skip=skip, limit=limit)
-    return sales
+async def read_sales(response: Response, skip: int = 0, limit: int = 100, after: Optional[str] = None, db: AsyncSession = Depends(get_db)):
+    after_key = sales_cursor(after) if after is not None else None
+    sales = await crud_async.get_sales(db, skip=skip, limit=limit + 1, after=after_key, as_rows=settings.fast_json)
+    if settings.fast_json:
+        return page_response(sales, limit, key=lambda sale: [sale["date"].replace(tzinfo=None).isoformat(), sale["id"]])
+    return page(response, sales, limit, key=lambda sale: [sale.date.isoformat(), sale.id])
+
+@router.get("/inventory/sales/report", response_model=schemas.SalesReport)
+async def read_sales_report(
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    db: AsyncSession = Depends(get_db),
+):
+    # Both bounds inclusive, in UTC days; read from the rollups
+    return await crud_async.get_sales_report(db, start, end)
+
+@router.get("/inventory/sales/stream", response_model=List[schemas.Sale])
+def stream_sales():
+    # Newest first, like the list
+    return ndjson_response(lambda db: crud.iter_sales(db, chunk_size=settings.stream_chunk_size))
 
 @router.post("/inventory/sales", response_model=schemas.Sale)
-def create_sale(sale: schemas.SaleCreate, db: Session = Depends(get_db)):
-    return crud.create_sale(db=db, sale=sale)
+async def create_sale(
+    sale: schemas.SaleCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias=idempotency.HEADER, min_length=1, max_length=idempotency.MAX_KEY_LENGTH),
+):
+    if idempotency_key is None:
+        db_sale = await write_queue.run_async(lambda db: crud.create_sale(db=db, sale=sale), schemas.Sale)
+    else:
+        db_sale, replayed = await write_queue.run_async(
+            lambda db: crud.create_sale_once(db=db, sale=sale, idempotency_key=idempotency_key)
+        )
+        if replayed:
+            response.headers[idempotency.REPLAYED_HEADER] = "true"
+            return db_sale
+    forecast_cache.mark_stale()
+    return db_sale
@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+import crud_async, schemas
+from database import AsyncSessionLocal
+from settings import settings
+
+router = APIRouter()
+
+async def get_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+@router.get("/sync", response_model=schemas.SyncResponse)
+async def sync(since: Optional[int] = Query(None, ge=0), db: AsyncSession = Depends(get_db)):
+    version, reset, more, changes = await crud_async.get_changes(db, since=since, limit=settings.sync_max_changes)
+    response = {"version": version, "reset": reset, "more": more}
+    for table, (rows, deleted) in changes.items():
+        response[table] = {"upserted": rows, "deleted": deleted}
+    return response
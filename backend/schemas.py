@@ -1,12 +1,14 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, field_serializer, field_validator
+from typing import Generic, List, Optional, TypeVar
+from datetime import date, datetime, timezone
 from models import AppointmentStatus
+import enum
 
 class PetBase(BaseModel):
     name: str
     species: str
     breed: str
-    birthDate: str
+    birthDate: date
     ownerId: int
 
 class PetCreate(PetBase):
@@ -15,8 +17,7 @@ class PetCreate(PetBase):
 class Pet(PetBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ClientBase(BaseModel):
     name: str
@@ -31,13 +32,13 @@ class Client(ClientBase):
     id: int
     pets: List[Pet] = []
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class AppointmentBase(BaseModel):
     clientId: int
     petId: int
-    date: str
+    # Wall-clock time at the clinic, stored as given
+    date: datetime
     reason: str
     notes: Optional[str] = None
     status: AppointmentStatus
@@ -48,8 +49,7 @@ class AppointmentCreate(AppointmentBase):
 class Appointment(AppointmentBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class AppointmentStatusUpdate(BaseModel):
     status: AppointmentStatus
@@ -66,8 +66,7 @@ class ProductCreate(ProductBase):
 class Product(ProductBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ProductUpdate(ProductBase):
     name: Optional[str] = None
@@ -86,8 +85,7 @@ class ServiceCreate(ServiceBase):
 class Service(ServiceBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ServiceUpdate(ServiceBase):
     name: Optional[str] = None
@@ -106,12 +104,19 @@ class SaleItemCreate(SaleItemBase):
 class SaleItem(SaleItemBase):
     id: int
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class SaleBase(BaseModel):
     total: float
-    date: str
+    date: datetime
+
+    @field_validator("date")
+    @classmethod
+    def to_utc(cls, value: datetime):
+        # Sales are stored as naive UTC; clients send toISOString() values
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
 
 class SaleCreate(SaleBase):
     items: List[SaleItemCreate]
@@ -120,5 +125,94 @@ class Sale(SaleBase):
     id: int
     items: List[SaleItem] = []
 
-    class Config:
-        orm_mode = True
+    @field_serializer("date")
+    def as_utc(self, value: datetime):
+        return value.replace(tzinfo=timezone.utc)
+
+    model_config = ConfigDict(from_attributes=True)
+
+class SalesDay(BaseModel):
+    day: date
+    revenue: float
+    units: int
+    transactions: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+class ProductSales(BaseModel):
+    product_id: int
+    revenue: float
+    units: int
+    transactions: int
+
+class SalesReport(BaseModel):
+    revenue: float
+    units: int
+    transactions: int
+    days: List[SalesDay]
+    products: List[ProductSales]
+
+class ReorderItem(BaseModel):
+    product_id: int
+    name: str
+    stock: int
+    reorder_point: int
+    daily_velocity: float
+    # Brings stock up to twice the reorder point
+    suggested_quantity: int
+    updated_at: datetime
+
+    @field_serializer("updated_at")
+    def as_utc(self, value: datetime):
+        return value.replace(tzinfo=timezone.utc)
+
+class DailyCount(BaseModel):
+    date: str
+    count: int
+
+class DashboardSummary(BaseModel):
+    total_clients: int
+    total_pets: int
+    upcoming_appointments: int
+    today_appointments: int
+    total_revenue: float
+    low_stock_products: int
+    weekly_appointments: List[DailyCount]
+
+class BulkEntity(str, enum.Enum):
+    CLIENTS = 'clients'
+    PETS = 'pets'
+    PRODUCTS = 'products'
+    SALES = 'sales'
+
+class BulkFormat(str, enum.Enum):
+    NDJSON = 'ndjson'
+    CSV = 'csv'
+
+class BulkRowError(BaseModel):
+    line: int
+    error: str
+
+class BulkImportReport(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BulkRowError]
+
+T = TypeVar("T")
+
+class TableChanges(BaseModel, Generic[T]):
+    upserted: List[T] = []
+    deleted: List[int] = []
+
+class SyncResponse(BaseModel):
+    version: int
+    # The client's version is unusable; reload the full lists, then sync from `version`
+    reset: bool = False
+    # More changes are waiting; call again with `version`
+    more: bool = False
+    clients: TableChanges[Client] = TableChanges[Client]()
+    pets: TableChanges[Pet] = TableChanges[Pet]()
+    appointments: TableChanges[Appointment] = TableChanges[Appointment]()
+    products: TableChanges[Product] = TableChanges[Product]()
+    services: TableChanges[Service] = TableChanges[Service]()
+    sales: TableChanges[Sale] = TableChanges[Sale]()
@@ -0,0 +1,127 @@
+import logging
+import re
+from collections import defaultdict
+from sqlalchemy import bindparam, inspect, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+import models
+
+logger = logging.getLogger(__name__)
+
+# One FTS5 row per client (rowid = client id) holding the client's own fields
+# plus the names of all their pets, so a single MATCH covers both.
+INDEX_TABLE = "client_search"
+# bm25 weights for name, email, phone, pets. Stored as the table's default
+# rank, so ORDER BY rank uses them. FTS5 scores and sorts every match before
+# applying the LIMIT, so a very common term costs as many rows as it matches.
+RANK = "bm25(10.0, 2.0, 2.0, 5.0)"
+
+_available = None
+
+def create_index(engine: Engine):
+    # Creates and fills the index on first start. SQLite builds without FTS5
+    # (and other databases) fall back to LIKE queries.
+    global _available
+    if engine.dialect.name != "sqlite":
+        _available = False
+        return
+    if inspect(engine).has_table(INDEX_TABLE):
+        _available = True
+        _configure_rank(engine)
+        return
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE {INDEX_TABLE} USING fts5("
+                "name, email, phone, pets, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+            ))
+    except OperationalError as e:
+        logger.warning("Client search index unavailable, using LIKE search: %s", e)
+        _available = False
+        return
+    _available = True
+    _configure_rank(engine)
+    rebuild_index(engine)
+
+def _configure_rank(engine: Engine):
+    # Indexes created before the weights were configured rank unweighted
+    with engine.begin() as conn:
+        current = conn.execute(text(f"SELECT v FROM {INDEX_TABLE}_config WHERE k = 'rank'")).scalar()
+        if current != RANK:
+            conn.execute(text(f"INSERT INTO {INDEX_TABLE} ({INDEX_TABLE}, rank) VALUES ('rank', :rank)"), {"rank": RANK})
+
+def rebuild_index(engine: Engine):
+    # Reindexes every client, e.g. after rows were bulk-loaded around the ORM
+    with Session(engine) as db:
+        ids = db.execute(select(models.Client.id).order_by(models.Client.id)).scalars().all()
+        for start in range(0, len(ids), 1000):
+            reindex_clients(db, ids[start:start + 1000])
+        db.commit()
+
+def _index_ready(db: Session):
+    global _available
+    if _available is None:
+        _available = db.get_bind().dialect.name == "sqlite" and db.execute(
+            text("SELECT 1 FROM sqlite_master WHERE name = :name"), {"name": INDEX_TABLE}
+        ).first() is not None
+    return _available
+
+def _digits(value: str):
+    return re.sub(r"\D", "", value or "")
+
+def reindex_clients(db: Session, client_ids):
+    # Rewrites the index rows of the given clients inside the caller's
+    # transaction, so the index commits or rolls back with the write itself.
+    client_ids = sorted({id for id in client_ids if id is not None})
+    if not client_ids or not _index_ready(db):
+        return
+    clients = db.execute(
+        select(models.Client.id, models.Client.name, models.Client.email, models.Client.phone)
+        .where(models.Client.id.in_(client_ids))
+    ).all()
+    pets = defaultdict(list)
+    for owner_id, name in db.execute(select(models.Pet.ownerId, models.Pet.name).where(models.Pet.ownerId.in_(client_ids))):
+        pets[owner_id].append(name or "")
+
+    db.execute(text(f"DELETE FROM {INDEX_TABLE} WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True)), {"ids": client_ids})
+    if clients:
+        db.execute(
+            text(f"INSERT INTO {INDEX_TABLE} (rowid, name, email, phone, pets) VALUES (:id, :name, :email, :phone, :pets)"),
+            [
+                # Digits-only copy so "(11) 9999" and "119999" both match
+                {"id": id, "name": name or "", "email": email or "", "phone": f"{phone or ''} {_digits(phone)}", "pets": " ".join(pets[id])}
+                for id, name, email, phone in clients
+            ],
+        )
+
+def _match_expression(query: str):
+    # Every word must match as a prefix; quoting keeps user input from being
+    # read as FTS5 syntax
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", query))
+
+def search_client_ids(db: Session, query: str, limit: int):
+    if _index_ready(db):
+        expression = _match_expression(query)
+        if not expression:
+            return []
+        # Ranks the whole match set; the best hit for a common word
+        # ("silva") may be any client, not one of the oldest
+        return db.execute(
+            text(f"SELECT rowid FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH :q ORDER BY rank LIMIT :limit"),
+            {"q": expression, "limit": limit},
+        ).scalars().all()
+
+    words = query.split()
+    if not words:
+        return []
+    stmt = select(models.Client.id)
+    for word in words:
+        pattern = f"%{word}%"
+        stmt = stmt.where(or_(
+            models.Client.name.ilike(pattern),
+            models.Client.email.ilike(pattern),
+            models.Client.phone.ilike(pattern),
+            models.Client.pets.any(models.Pet.name.ilike(pattern)),
+        ))
+    return db.execute(stmt.order_by(models.Client.name).limit(limit)).scalars().all()
@@ -0,0 +1,74 @@
+import os
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+def _async_url(url: str):
+    scheme, sep, rest = url.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+class Settings:
+    def __init__(self):
+        self.database_url = os.getenv("DATABASE_URL", "sqlite:///./sql_app.db")
+        # Off when a deploy step runs `python migrations.py` once instead of
+        # every worker upgrading the schema as it starts
+        self.migrate_on_startup = os.getenv("MIGRATE_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+        self.async_database_url = os.getenv("ASYNC_DATABASE_URL", _async_url(self.database_url))
+        self.db_pool_size = int(os.getenv("DB_POOL_SIZE", "10"))
+        self.db_max_overflow = int(os.getenv("DB_MAX_OVERFLOW", "30"))
+        self.sqlite_journal_mode = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+        self.sqlite_synchronous = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+        self.sqlite_busy_timeout_ms = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+        # Negative cache_size is in KiB, so -65536 is 64 MiB per connection
+        self.sqlite_cache_size = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+        self.sqlite_mmap_size = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+        self.write_queue_enabled = os.getenv("WRITE_QUEUE_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.write_queue_max_batch = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "64"))
+        self.write_queue_window_ms = float(os.getenv("WRITE_QUEUE_WINDOW_MS", "2"))
+        self.write_queue_timeout = float(os.getenv("WRITE_QUEUE_TIMEOUT", "30"))
+        self.forecast_lookback_days = int(os.getenv("FORECAST_LOOKBACK_DAYS", "365"))
+        self.forecast_chunk_size = int(os.getenv("FORECAST_CHUNK_SIZE", "1000"))
+        self.forecast_workers = int(os.getenv("FORECAST_WORKERS", "2"))
+        self.forecast_max_queue = int(os.getenv("FORECAST_MAX_QUEUE", "8"))
+        self.forecast_timeout = float(os.getenv("FORECAST_TIMEOUT", "20"))
+        self.forecast_arima_top_n = int(os.getenv("FORECAST_ARIMA_TOP_N", "5"))
+        self.dashboard_cache_ttl = float(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+        # "memory" keeps catalog versions per process; "database" shares them
+        # through the cache_versions table so every worker revalidates alike
+        self.catalog_cache_backend = os.getenv("CATALOG_CACHE_BACKEND", "memory")
+        self.catalog_cache_max_entries = int(os.getenv("CATALOG_CACHE_MAX_ENTRIES", "256"))
+        # Seconds a "memory" entry lives before it is rebuilt and compared, so
+        # workers pick up each other's catalog writes
+        self.catalog_cache_ttl = float(os.getenv("CATALOG_CACHE_TTL", "30"))
+        self.change_log_retention_days = int(os.getenv("CHANGE_LOG_RETENTION_DAYS", "30"))
+        self.sync_max_changes = int(os.getenv("SYNC_MAX_CHANGES", "5000"))
+        self.low_stock_threshold = int(os.getenv("LOW_STOCK_THRESHOLD", "5"))
+        # Reorder once stock covers fewer than REORDER_COVER_DAYS of the daily
+        # demand seen over the last REORDER_VELOCITY_DAYS
+        self.reorder_velocity_days = int(os.getenv("REORDER_VELOCITY_DAYS", "28"))
+        self.reorder_cover_days = int(os.getenv("REORDER_COVER_DAYS", "14"))
+        # Every product is re-evaluated this often as the window slides
+        self.reorder_refresh_minutes = float(os.getenv("REORDER_REFRESH_MINUTES", "60"))
+        # Reorder event streams re-check this often for other workers' writes
+        self.reorder_events_poll_seconds = float(os.getenv("REORDER_EVENTS_POLL_SECONDS", "15"))
+        # "selectin" batches child rows per page in IN-chunks; "joined" is the
+        # old LEFT OUTER JOIN eager load, kept for comparison benchmarks
+        self.relationship_loading = os.getenv("RELATIONSHIP_LOADING", "selectin")
+        self.relationship_chunk_size = int(os.getenv("RELATIONSHIP_CHUNK_SIZE", "500"))
+        # Serve list endpoints from plain column rows encoded straight to JSON,
+        # skipping ORM instances and response-model validation
+        self.fast_json = os.getenv("FAST_JSON", "false").lower() in ("1", "true", "yes")
+        # "gzip", "brotli" (needs brotli-asgi, falls back to gzip) or "off"
+        self.compression = os.getenv("COMPRESSION", "gzip").lower()
+        self.compression_minimum_size = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+        self.gzip_level = int(os.getenv("GZIP_LEVEL", "6"))
+        self.stream_chunk_size = int(os.getenv("STREAM_CHUNK_SIZE", "1000"))
+        self.slow_query_ms = float(os.getenv("SLOW_QUERY_MS", "100"))
+        self.max_queries_per_request = int(os.getenv("MAX_QUERIES_PER_REQUEST", "50"))
+        # How long a sale's Idempotency-Key replays the stored response
+        self.idempotency_key_ttl_hours = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+
+settings = Settings()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# Settings are read on import, so point them at a scratch database before
+# anything imports database/main
+_tmp = tempfile.mkdtemp(prefix="vetsoft-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture(scope="session")
+def client():
+    from main import app
+    # Entering the client runs the lifespan, which migrates the database
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def queue_disabled(monkeypatch):
+    # WRITE_QUEUE_ENABLED=false: every request writes through its own session
+    from write_queue import write_queue
+    monkeypatch.setattr(write_queue, "enabled", False)
+
+@pytest.fixture
+def make_product(client):
+    def make_product(stock: int, price: float = 10.0):
+        response = client.post("/inventory/products", json={
+            "name": f"Produto {uuid.uuid4().hex[:8]}", "description": "", "price": price, "stock": stock,
+        })
+        assert response.status_code == 200, response.text
+        return response.json()
+    return make_product
+
+@pytest.fixture
+def held_group(client):
+    # Runs the writes as one group on a fresh queue and holds it open after
+    # their SAVEPOINTs are released, before the group commits. Yields the
+    # writes' futures.
+    from write_queue import WriteQueue
+
+    @contextmanager
+    def held_group(*writes):
+        queue = WriteQueue(enabled=True, max_batch=64, window_ms=500, timeout=10)
+        holding, release = threading.Event(), threading.Event()
+
+        def hold(db):
+            holding.set()
+            release.wait(5)
+
+        with ThreadPoolExecutor(max_workers=len(writes) + 1) as pool:
+            futures = [pool.submit(queue.run, write) for write in writes]
+            # Queued last, so it runs after every write in the group
+            time.sleep(0.05)
+            held = pool.submit(queue.run, hold)
+            assert holding.wait(5)
+            try:
+                yield futures
+            finally:
+                release.set()
+                held.result()
+    return held_group
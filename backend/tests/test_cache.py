@@ -0,0 +1,51 @@
+import time
+from sqlalchemy import update
+import crud, models, schemas
+from database import write_engine
+from cache import TTLCache
+
+def test_value_built_across_an_invalidation_is_not_stored():
+    cache = TTLCache(60, tables={"sales"})
+
+    def build_during_commit():
+        # The commit lands while the value is being built from older data
+        cache.invalidate()
+        return "before commit"
+
+    assert cache.get_or_set("summary", build_during_commit) == "before commit"
+    assert cache.get_or_set("summary", lambda: "after commit") == "after commit"
+    assert cache.get_or_set("summary", lambda: "not rebuilt") == "after commit"
+
+def _stock(client, product_id):
+    products = client.get("/inventory/products", params={"limit": 1000}).json()
+    return next(p["stock"] for p in products if p["id"] == product_id)
+
+def test_catalog_read_before_the_group_commits_is_not_served_after(client, make_product, held_group):
+    product = make_product(stock=10)
+    with held_group(lambda db: crud.update_product(db, product["id"], schemas.ProductUpdate(stock=3))):
+        # Not committed yet: readers still see, and may cache, the old stock
+        assert _stock(client, product["id"]) == 10
+    assert _stock(client, product["id"]) == 3
+
+def test_memory_catalog_picks_up_another_workers_write_after_ttl(client, make_product, monkeypatch):
+    from routers.inventory import product_cache
+    monkeypatch.setattr(product_cache, "ttl", 0.2)
+    product = make_product(stock=10)
+    first = client.get("/inventory/products", params={"limit": 1000})
+    # Another worker's commit: this process's session hooks never see it
+    with write_engine.begin() as conn:
+        conn.execute(update(models.Product).where(models.Product.id == product["id"]).values(stock=4))
+    assert _stock(client, product["id"]) == 10
+    time.sleep(0.3)
+    assert _stock(client, product["id"]) == 4
+    second = client.get("/inventory/products", params={"limit": 1000}, headers={"If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert second.headers["ETag"] != first.headers["ETag"]
+
+def test_dashboard_read_before_the_group_commits_is_not_served_after(client, make_product, held_group):
+    product = make_product(stock=100)
+    low_stock = client.get("/dashboard/summary").json()["low_stock_products"]
+    with held_group(lambda db: crud.update_product(db, product["id"], schemas.ProductUpdate(stock=0))):
+        # Built from the old reorder points while the group is still open
+        assert client.get("/dashboard/summary").json()["low_stock_products"] == low_stock
+    assert client.get("/dashboard/summary").json()["low_stock_products"] == low_stock + 1
@@ -0,0 +1,27 @@
+import uuid
+import crud, schemas
+from database import SessionLocal
+from settings import settings
+
+def test_rows_and_orm_objects_load_the_same_children(client, monkeypatch):
+    # Small chunks, so the clients' pets span several IN queries
+    monkeypatch.setattr(settings, "relationship_chunk_size", 2)
+    owners = {}
+    for pets in range(4):
+        tag = uuid.uuid4().hex[:8]
+        owner = client.post("/clients/", json={
+            "name": f"Cliente {tag}", "phone": "", "email": f"{tag}@example.com", "address": "",
+        }).json()
+        owners[owner["id"]] = pets
+        for i in range(pets):
+            response = client.post("/pets/", json={
+                "name": f"Pet {i}", "species": "Cão", "breed": "", "birthDate": "2020-01-01", "ownerId": owner["id"],
+            })
+            assert response.status_code == 200, response.text
+
+    with SessionLocal() as db:
+        objects = [schemas.Client.model_validate(c).model_dump() for c in crud.get_clients(db, limit=1000)]
+    with SessionLocal() as db:
+        rows = [schemas.Client.model_validate(c).model_dump() for c in crud.get_clients(db, limit=1000, as_rows=True)]
+    assert rows == objects
+    assert {c["id"]: len(c["pets"]) for c in rows if c["id"] in owners} == owners
@@ -0,0 +1,49 @@
+import time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import crud, forecasting
+from database import SessionLocal
+from forecast_cache import ForecastCache
+
+def test_naive_fallback_is_refitted(client, monkeypatch):
+    fits = iter([{"model": "naive"}, {"model": "arima"}])
+    monkeypatch.setattr(forecasting, "build_sales_forecast", lambda db: next(fits))
+    with SessionLocal() as db:
+        version = crud.get_sales_version(db)
+    cache = ForecastCache()
+    try:
+        # Cold cache and the pool too busy: the fallback is served as stale
+        first = cache.fit_now(version)
+        assert first["model"] == "naive" and first["stale"]
+
+        # ...and the next request schedules the real fit, although the sales
+        # data hasn't moved
+        assert cache.serve(version)["stale"]
+        deadline = time.monotonic() + 5
+        while cache.serve(version)["model"] != "arima" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        refitted = cache.serve(version)
+        assert refitted["model"] == "arima" and not refitted["stale"]
+    finally:
+        cache.stop()
+
+def test_failed_arima_fit_falls_back_to_naive(client, make_product, monkeypatch):
+    product = make_product(stock=1000)
+    today = datetime.now(timezone.utc)
+    for days_ago in range(20):
+        response = client.post("/inventory/sales", json={
+            "total": product["price"],
+            "date": (today - timedelta(days=days_ago)).isoformat(),
+            "items": [{"product_id": product["id"], "quantity": 1, "price": product["price"]}],
+        })
+        assert response.status_code == 200, response.text
+
+    def fails(*args, **kwargs):
+        # What statsmodels raises on a degenerate series
+        raise np.linalg.LinAlgError("Schur decomposition solver error.")
+
+    monkeypatch.setattr(forecasting.forecast_executor, "run", fails)
+    with SessionLocal() as db:
+        forecast = forecasting.build_sales_forecast(db)
+    assert forecast["model"] == "naive"
+    assert len(forecast["forecast"]) == 30
@@ -0,0 +1,36 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import pytest
+from write_queue import write_queue
+
+@pytest.mark.parametrize("queue_enabled", [True, False])
+def test_concurrent_duplicates_sell_once(client, make_product, monkeypatch, queue_enabled):
+    monkeypatch.setattr(write_queue, "enabled", queue_enabled)
+    product = make_product(stock=100)
+    sale = {
+        "total": product["price"] * 2,
+        "date": datetime.now(timezone.utc).isoformat(),
+        "items": [{"product_id": product["id"], "quantity": 2, "price": product["price"]}],
+    }
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        responses = list(pool.map(lambda _: client.post("/inventory/sales", json=sale, headers=headers), range(32)))
+
+    assert [r.status_code for r in responses] == [200] * 32
+    assert len({r.json()["id"] for r in responses}) == 1
+    assert sum(r.headers.get("Idempotency-Replayed") != "true" for r in responses) == 1
+    products = client.get("/inventory/products", params={"limit": 1000}).json()
+    assert next(p["stock"] for p in products if p["id"] == product["id"]) == 98
+
+def test_key_reused_for_different_sale(client, make_product):
+    product = make_product(stock=10)
+    sale = {
+        "total": product["price"],
+        "date": datetime.now(timezone.utc).isoformat(),
+        "items": [{"product_id": product["id"], "quantity": 1, "price": product["price"]}],
+    }
+    headers = {"Idempotency-Key": str(uuid.uuid4())}
+    assert client.post("/inventory/sales", json=sale, headers=headers).status_code == 200
+    changed = {**sale, "total": sale["total"] * 2, "items": [{**sale["items"][0], "quantity": 2}]}
+    assert client.post("/inventory/sales", json=changed, headers=headers).status_code == 422
@@ -0,0 +1,44 @@
+import asyncio
+import logging
+from sqlalchemy import text
+import metrics
+from database import engine
+from settings import settings
+
+def _app(content_type: bytes, queries: int):
+    # A response that runs its queries after the headers went out, the way
+    # a streaming endpoint does
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]})
+        with engine.connect() as conn:
+            for _ in range(queries):
+                conn.execute(text("SELECT 1"))
+        await send({"type": "http.response.body", "body": b""})
+    return app
+
+def _call(app, path: str):
+    scope = {"type": "http", "method": "GET", "path": path}
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        pass
+
+    asyncio.run(metrics.MetricsMiddleware(app)(scope, receive, send))
+
+def test_event_streams_are_not_counted_as_one_request(client, caplog):
+    queries = settings.max_queries_per_request + 10
+    before = metrics.request_queries.totals().get(("GET", "unmatched"), (0, 0))
+    with caplog.at_level(logging.WARNING, logger="metrics"):
+        _call(_app(b"text/event-stream; charset=utf-8", queries), "/events")
+    assert metrics.request_queries.totals().get(("GET", "unmatched"), (0, 0)) == before
+    assert "possible N+1" not in caplog.text
+
+    # An ordinary response doing the same is still counted and flagged
+    with caplog.at_level(logging.WARNING, logger="metrics"):
+        _call(_app(b"application/json", queries), "/json")
+    count, total = metrics.request_queries.totals()[("GET", "unmatched")]
+    # Plus the BEGIN the SQLite profile emits itself
+    assert count == before[0] + 1 and total >= before[1] + queries
+    assert "possible N+1" in caplog.text
@@ -0,0 +1,21 @@
+from datetime import date, datetime
+from sqlalchemy import create_engine, select, text
+import migrations, models
+
+def test_temporal_columns_keep_appointments_in_wall_clock_time(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        # Strings as older clients sent them
+        conn.execute(text("INSERT INTO appointments (id, date) VALUES (1, '2024-03-10T09:30:00-03:00'), (2, '2024-03-10T14:00')"))
+        conn.execute(text("INSERT INTO sales (id, date) VALUES (1, '2024-03-10T23:30:00-03:00'), (2, '2024-03-10T12:00:00.000Z')"))
+        conn.execute(text("INSERT INTO pets (id, birthDate) VALUES (1, '2020-05-01T00:00:00.000Z')"))
+        migrations._temporal_columns(conn)
+
+    with engine.connect() as conn:
+        appointments = dict(conn.execute(select(models.Appointment.id, models.Appointment.date)).all())
+        sales = dict(conn.execute(select(models.Sale.id, models.Sale.date)).all())
+        pets = dict(conn.execute(select(models.Pet.id, models.Pet.birthDate)).all())
+    assert appointments == {1: datetime(2024, 3, 10, 9, 30), 2: datetime(2024, 3, 10, 14, 0)}
+    assert sales == {1: datetime(2024, 3, 11, 2, 30), 2: datetime(2024, 3, 10, 12, 0)}
+    assert pets == {1: date(2020, 5, 1)}
@@ -0,0 +1,59 @@
+import asyncio
+from datetime import date, datetime, timedelta, timezone
+from sqlalchemy import update
+import crud, models, reorder, schemas
+from database import WriteSessionLocal, write_engine
+
+def _reorder_ids(client):
+    return {item["product_id"] for item in client.get("/inventory/reorder").json()}
+
+def _sell(client, product, quantity):
+    response = client.post("/inventory/sales", json={
+        "total": product["price"] * quantity,
+        "date": datetime.now(timezone.utc).isoformat(),
+        "items": [{"product_id": product["id"], "quantity": quantity, "price": product["price"]}],
+    })
+    assert response.status_code == 200, response.text
+
+def test_sales_and_restocks_move_products_in_and_out(client, make_product):
+    product = make_product(stock=40)
+    assert product["id"] not in _reorder_ids(client)
+    # 30 units in the window cover 14 days at 15 units; 10 left is too few
+    _sell(client, product, 30)
+    assert product["id"] in _reorder_ids(client)
+    client.put(f"/inventory/products/{product['id']}", json={"stock": 100})
+    assert product["id"] not in _reorder_ids(client)
+
+def test_periodic_refresh_drops_products_whose_sales_aged_out(client, make_product):
+    product = make_product(stock=40)
+    _sell(client, product, 30)
+    assert product["id"] in _reorder_ids(client)
+
+    # The sale leaves the velocity window without any write to the product
+    with WriteSessionLocal() as db:
+        db.execute(
+            update(models.ProductSalesDaily)
+            .where(models.ProductSalesDaily.product_id == product["id"])
+            .values(day=date.today() - timedelta(days=90))
+        )
+        db.commit()
+    assert product["id"] in _reorder_ids(client)
+
+    async def run_one_refresh():
+        task = asyncio.create_task(reorder.refresh_periodically(write_engine, 0.01))
+        await asyncio.sleep(0.5)
+        task.cancel()
+
+    asyncio.run(run_one_refresh())
+    assert product["id"] not in _reorder_ids(client)
+
+def test_streams_are_notified_once_the_group_commits(client, make_product, held_group, monkeypatch):
+    product = make_product(stock=40)
+    notified = []
+    monkeypatch.setattr(reorder.notifier, "notify", lambda: notified.append(True))
+    with held_group(lambda db: crud.update_product(db, product["id"], schemas.ProductUpdate(stock=1))):
+        # A stream woken now would re-read the list without the change
+        assert notified == []
+        assert product["id"] not in _reorder_ids(client)
+    assert notified == [True]
+    assert product["id"] in _reorder_ids(client)
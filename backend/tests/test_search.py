@@ -0,0 +1,16 @@
+import crud, models
+from database import WriteSessionLocal
+
+def test_best_match_is_not_cut_off_by_insertion_order(client):
+    # Hundreds of weak (email) matches inserted before the strong (name) one
+    with WriteSessionLocal() as db:
+        crud.bulk_insert(db, models.Client, [
+            {"name": f"Cliente {i}", "email": f"zanetti{i}@vetsoft.test", "phone": "", "address": ""}
+            for i in range(600)
+        ])
+        crud.bulk_insert(db, models.Client, [{"name": "Maria Zanetti", "email": "maria@vetsoft.test", "phone": "", "address": ""}])
+        db.commit()
+
+    results = client.get("/clients/search", params={"q": "zanetti", "limit": 5}).json()
+    assert results[0]["name"] == "Maria Zanetti"
+    assert len(results) == 5
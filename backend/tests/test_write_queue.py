@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import pytest
+from fastapi import HTTPException
+import crud, schemas
+from write_queue import WriteQueue
+
+def _sale(product, quantity=1):
+    return {
+        "total": product["price"] * quantity,
+        "date": datetime.now(timezone.utc).isoformat(),
+        "items": [{"product_id": product["id"], "quantity": quantity, "price": product["price"]}],
+    }
+
+def _stock(client, product_id):
+    products = client.get("/inventory/products", params={"limit": 1000}).json()
+    return next(p["stock"] for p in products if p["id"] == product_id)
+
+def test_concurrent_sales_without_queue(client, make_product, queue_disabled):
+    # Each sale reads stock before it writes; without BEGIN IMMEDIATE the
+    # losers of the write lock fail with "database is locked"
+    product = make_product(stock=1000)
+    with ThreadPoolExecutor(max_workers=32) as pool:
+        responses = list(pool.map(lambda _: client.post("/inventory/sales", json=_sale(product)), range(64)))
+    assert [r.status_code for r in responses] == [200] * 64, [r.text for r in responses if r.status_code != 200][:3]
+    assert _stock(client, product["id"]) == 1000 - 64
+
+def _blocked_queue():
+    # A queue whose writer is stuck on the first job until release is set
+    queue = WriteQueue(enabled=True, max_batch=64, window_ms=2, timeout=0.2)
+    release = threading.Event()
+    ran = []
+
+    def slow(db):
+        release.wait(5)
+        ran.append("slow")
+        return "slow"
+
+    def queued(db):
+        ran.append("queued")
+        return "queued"
+
+    return queue, release, ran, slow, queued
+
+def test_timeout_cancels_only_queued_jobs(client):
+    queue, release, ran, slow, queued = _blocked_queue()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        started = pool.submit(queue.run, slow)
+        time.sleep(0.05)
+        with pytest.raises(HTTPException) as error:
+            queue.run(queued)
+        assert error.value.status_code == 503
+        release.set()
+        # Past its timeout too, but already running: the caller gets the result
+        assert started.result() == "slow"
+    assert ran == ["slow"]
+
+def test_timeout_cancels_only_queued_jobs_async(client):
+    queue, release, ran, slow, queued = _blocked_queue()
+
+    async def scenario():
+        started = asyncio.ensure_future(queue.run_async(slow))
+        await asyncio.sleep(0.05)
+        with pytest.raises(HTTPException) as error:
+            await queue.run_async(queued)
+        assert error.value.status_code == 503
+        release.set()
+        assert await started == "slow"
+
+    asyncio.run(scenario())
+    assert ran == ["slow"]
+
+def test_failed_job_keeps_the_groups_writes_for_the_commit_hooks(client, make_product, held_group):
+    product = make_product(stock=10)
+
+    def fails(db):
+        crud.update_product(db, product["id"], schemas.ProductUpdate(price=99.0))
+        raise ValueError("rejected")
+
+    write = lambda db: crud.update_product(db, product["id"], schemas.ProductUpdate(stock=3))
+    with held_group(write, fails) as (written, failed):
+        assert _stock(client, product["id"]) == 10
+    with pytest.raises(ValueError):
+        failed.result()
+    # The failed job's SAVEPOINT rollback must not drop the other job's write
+    # from the invalidation that follows the group commit
+    products = client.get("/inventory/products", params={"limit": 1000}).json()
+    assert next(p for p in products if p["id"] == product["id"])["stock"] == 3
+    assert next(p for p in products if p["id"] == product["id"])["price"] == 10.0
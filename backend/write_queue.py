@@ -0,0 +1,157 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from fastapi import HTTPException
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, sessionmaker
+from database import WriteSessionLocal, write_engine
+from settings import settings
+
+class GroupCommitSession(Session):
+    # Session handed to queued writes. The crud functions keep calling
+    # commit() and rollback() as usual, but each job runs inside its own
+    # SAVEPOINT and the queue commits the whole group once.
+    #
+    # Releasing or rolling back a SAVEPOINT fires the session's commit and
+    # rollback events like a real commit does. Hooks that act on committed
+    # data (cache invalidation, reorder notifications) must skip nested
+    # transactions, so they run once, after commit_group().
+
+    def commit(self):
+        self.flush()
+
+    def rollback(self):
+        # The job's SAVEPOINT is rolled back when its exception propagates
+        pass
+
+    def commit_group(self):
+        super().commit()
+
+    def rollback_group(self):
+        super().rollback()
+
+WriterSessionLocal = sessionmaker(
+    class_=GroupCommitSession,
+    autocommit=False,
+    autoflush=False,
+    bind=write_engine,
+)
+
+def _serialize(value, schema):
+    if value is None or schema is None or isinstance(value, BaseModel):
+        return value
+    return schema.model_validate(value, from_attributes=True)
+
+class WriteQueue:
+    # Funnels small write transactions from every request thread through one
+    # writer thread, which commits whatever arrived within a short window as a
+    # single transaction. One fsync per group instead of one per request, and
+    # no lock contention between writers inside the process.
+
+    def __init__(self, enabled: bool, max_batch: int, window_ms: float, timeout: float):
+        self.enabled = enabled
+        self.max_batch = max_batch
+        self.window = window_ms / 1000
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+    def run(self, fn, schema=None):
+        # fn(db) performs the write; its result is serialized with schema
+        # while the writer session is still open
+        if not self.enabled:
+            db = WriteSessionLocal()
+            try:
+                return _serialize(fn(db), schema)
+            finally:
+                db.close()
+
+        future = self._submit(fn, schema)
+        try:
+            return future.result(timeout=self.timeout)
+        except concurrent.futures.TimeoutError:
+            self._cancel(future)
+            return future.result()
+
+    async def run_async(self, fn, schema=None):
+        # Same as run() for async endpoints: awaits the writer thread without
+        # tying up a threadpool worker while the group commits
+        if not self.enabled:
+            return await run_in_threadpool(self.run, fn, schema)
+        future = self._submit(fn, schema)
+        waiter = asyncio.wrap_future(future)
+        try:
+            # shield: a timeout must not cancel a job the writer has started
+            return await asyncio.wait_for(asyncio.shield(waiter), self.timeout)
+        except asyncio.TimeoutError:
+            self._cancel(future)
+            return await waiter
+
+    def _cancel(self, future: Future):
+        # Only a job still waiting in the queue can be withdrawn. One the
+        # writer has started will commit regardless, so the caller waits for
+        # it; failing it would invite a retry that writes twice.
+        if future.cancel():
+            raise HTTPException(status_code=503, detail="Too many writes queued, please retry", headers={"Retry-After": "1"})
+
+    def _submit(self, fn, schema):
+        future = Future()
+        self._ensure_worker()
+        # The job runs in the caller's context so per-request state (query
+        # counts) follows it into the writer thread
+        self._queue.put((contextvars.copy_context(), fn, schema, future))
+        return future
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="write-queue", daemon=True)
+                self._worker.start()
+
+    def _next_group(self):
+        jobs = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(jobs) < self.max_batch:
+            try:
+                jobs.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        return jobs
+
+    def _run(self):
+        while True:
+            jobs = self._next_group()
+            db = WriterSessionLocal()
+            done = []
+            try:
+                for context, fn, schema, future in jobs:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with db.begin_nested():
+                            done.append((future, context.run(lambda: _serialize(fn(db), schema))))
+                    except Exception as e:
+                        future.set_exception(e)
+                db.commit_group()
+            except Exception as e:
+                db.rollback_group()
+                for future, _ in done:
+                    future.set_exception(e)
+            else:
+                for future, result in done:
+                    future.set_result(result)
+            finally:
+                db.close()
+
+write_queue = WriteQueue(
+    settings.write_queue_enabled,
+    settings.write_queue_max_batch,
+    settings.write_queue_window_ms,
+    settings.write_queue_timeout,
+)
@@ -1,5 +1,5 @@
-import React, { useState, useMemo } from 'react';
-import { Appointment, Client, Pet, AppointmentStatus } from '../types';
+import React, { useState, useMemo, useEffect } from 'react';
+import { Appointment, Client, Pet, AppointmentStatus, DailyCount } from '../types';
 import { Modal } from './Modal';
 import { PlusIcon, CalendarIcon } from './icons';
 
@@ -86,34 +86,87 @@ const getStatusColor = (status: AppointmentStatus) => {
     }
 };
 
+const API_URL = '/api';
+
+const startOfWeek = (day: Date) => {
+    const start = new Date(day.getFullYear(), day.getMonth(), day.getDate());
+    start.setDate(start.getDate() - ((start.getDay() + 6) % 7)); // Monday
+    return start;
+};
+
+const addDays = (day: Date, days: number) => {
+    const moved = new Date(day);
+    moved.setDate(moved.getDate() + days);
+    return moved;
+};
+
+// The API filters on clinic wall-clock time, so no UTC conversion
+const localIso = (day: Date) => {
+    const pad = (n: number) => String(n).padStart(2, '0');
+    return `${day.getFullYear()}-${pad(day.getMonth() + 1)}-${pad(day.getDate())}T${pad(day.getHours())}:${pad(day.getMinutes())}:${pad(day.getSeconds())}`;
+};
+
+const fetchJson = async <T,>(path: string, params: Record<string, string>): Promise<T> => {
+    const response = await fetch(`${API_URL}${path}?${new URLSearchParams(params)}`);
+    if (!response.ok) throw new Error(`${path}: ${response.status}`);
+    return response.json();
+};
+
+const byDate = (a: Appointment, b: Appointment) => new Date(a.date).getTime() - new Date(b.date).getTime();
+
 export const Appointments: React.FC<AppointmentsProps> = ({ appointments, clients, addAppointment, updateAppointmentStatus }) => {
     const [isModalOpen, setModalOpen] = useState(false);
     const [searchTerm, setSearchTerm] = useState('');
+    const [weekStart, setWeekStart] = useState(() => startOfWeek(new Date()));
+    const [upcoming, setUpcoming] = useState<Appointment[]>([]);
+    const [week, setWeek] = useState<Appointment[]>([]);
+    const [monthCounts, setMonthCounts] = useState<DailyCount[]>([]);
 
     const pets = useMemo(() => clients.flatMap(c => c.pets || []), [clients]);
 
     const findClientName = (id: number) => clients.find(c => c.id === id)?.name || 'Desconhecido';
     const findPetName = (id: number) => pets.find(p => p.id === id)?.name || 'Desconhecido';
 
-    const sortedAppointments = useMemo(() => 
-        [...appointments].sort((a, b) => new Date(b.date).getTime() - new Date(a.date).getTime()),
-        [appointments]
-    );
+    // Only the selected week is loaded, from the indexed date/status
+    // filters; `appointments` changing (new booking, status change, sync)
+    // just triggers a reload
+    useEffect(() => {
+        const weekEnd = addDays(weekStart, 7);
+        const now = new Date();
+        const from = localIso(now > weekStart ? now : weekStart);
+        Promise.all([
+            now < weekEnd
+                ? fetchJson<Appointment[]>('/appointments/', { status: AppointmentStatus.SCHEDULED, from, to: localIso(weekEnd), limit: '1000' })
+                : Promise.resolve([]),
+            fetchJson<Appointment[]>('/appointments/', { from: localIso(weekStart), to: localIso(weekEnd), limit: '1000' }),
+        ])
+            .then(([upcomingRows, weekRows]) => {
+                setUpcoming(upcomingRows.sort(byDate));
+                setWeek(weekRows.sort(byDate).reverse());
+            })
+            .catch(e => console.error('Failed to fetch appointments', e));
+    }, [weekStart, appointments]);
 
-    const filteredAppointments = useMemo(() => {
-        if (!searchTerm.trim()) {
-            return sortedAppointments;
-        }
-        const lowercasedFilter = searchTerm.toLowerCase();
-        return sortedAppointments.filter(app => {
-            const clientName = findClientName(app.clientId).toLowerCase();
-            const petName = findPetName(app.petId).toLowerCase();
-            return clientName.includes(lowercasedFilter) || petName.includes(lowercasedFilter);
-        });
-    }, [sortedAppointments, searchTerm, clients, pets]);
-
-    const upcomingAppointments = filteredAppointments.filter(a => new Date(a.date) >= new Date() && a.status === AppointmentStatus.SCHEDULED);
-    const pastAppointments = filteredAppointments.filter(a => new Date(a.date) < new Date() || a.status !== AppointmentStatus.SCHEDULED);
+    // Per-day counts for the month around the selected week
+    const year = weekStart.getFullYear();
+    const month = weekStart.getMonth() + 1;
+    useEffect(() => {
+        fetchJson<DailyCount[]>('/appointments/calendar', { year: String(year), month: String(month) })
+            .then(setMonthCounts)
+            .catch(e => console.error('Failed to fetch appointment calendar', e));
+    }, [year, month, appointments]);
+
+    const matchesSearch = (app: Appointment) => {
+        const lowercasedFilter = searchTerm.trim().toLowerCase();
+        if (!lowercasedFilter) return true;
+        return findClientName(app.clientId).toLowerCase().includes(lowercasedFilter)
+            || findPetName(app.petId).toLowerCase().includes(lowercasedFilter);
+    };
+
+    const upcomingIds = useMemo(() => new Set(upcoming.map(a => a.id)), [upcoming]);
+    const upcomingAppointments = upcoming.filter(matchesSearch);
+    const pastAppointments = week.filter(a => !upcomingIds.has(a.id)).filter(matchesSearch);
+    const weekLabel = `${weekStart.toLocaleDateString('pt-BR')} – ${addDays(weekStart, 6).toLocaleDateString('pt-BR')}`;
     
     return (
         <div className="p-4 sm:p-8">
@@ -134,6 +187,28 @@ export const Appointments: React.FC<AppointmentsProps> = ({ appointments, client
                 />
             </div>
 
+            <div className="bg-white rounded-lg shadow-md p-4 mb-6">
+                <div className="flex items-center justify-between mb-3">
+                    <button onClick={() => setWeekStart(addDays(weekStart, -7))} className="px-3 py-1 bg-gray-200 text-gray-800 rounded-md hover:bg-gray-300">&larr;</button>
+                    <span className="flex items-center font-semibold text-gray-700"><CalendarIcon className="w-5 h-5 mr-2" /> Semana de {weekLabel}</span>
+                    <button onClick={() => setWeekStart(addDays(weekStart, 7))} className="px-3 py-1 bg-gray-200 text-gray-800 rounded-md hover:bg-gray-300">&rarr;</button>
+                </div>
+                <div className="grid grid-cols-7 gap-1 text-center text-xs">
+                    {['S', 'T', 'Q', 'Q', 'S', 'S', 'D'].map((weekday, i) => <div key={i} className="font-semibold text-gray-500">{weekday}</div>)}
+                    {monthCounts.length > 0 && Array.from({ length: (new Date(`${monthCounts[0].date}T00:00:00`).getDay() + 6) % 7 }, (_, i) => <div key={`blank-${i}`} />)}
+                    {monthCounts.map(({ date, count }) => {
+                        const day = new Date(`${date}T00:00:00`);
+                        const inWeek = day >= weekStart && day < addDays(weekStart, 7);
+                        return (
+                            <button key={date} onClick={() => setWeekStart(startOfWeek(day))} className={`p-1 rounded ${inWeek ? 'bg-teal-500 text-white' : 'hover:bg-gray-100'}`}>
+                                <div>{day.getDate()}</div>
+                                <div className={inWeek ? '' : 'text-gray-500'}>{count > 0 ? count : '·'}</div>
+                            </button>
+                        );
+                    })}
+                </div>
+            </div>
+
             <div className="space-y-8">
                 <div>
                     <h2 className="text-2xl font-semibold text-gray-700 mb-4">Próximos Agendamentos</h2>
@@ -154,7 +229,7 @@ export const Appointments: React.FC<AppointmentsProps> = ({ appointments, client
                                         </div>
                                    </div>
                                </li>
-                           )) : <p className="p-4 text-gray-500">Nenhum agendamento futuro encontrado.</p>}
+                           )) : <p className="p-4 text-gray-500">Nenhum agendamento futuro nesta semana.</p>}
                         </ul>
                     </div>
                 </div>
@@ -172,7 +247,7 @@ export const Appointments: React.FC<AppointmentsProps> = ({ appointments, client
                                         <span className={`px-2 py-1 text-xs font-semibold rounded-full ${getStatusColor(app.status)}`}>{app.status}</span>
                                    </div>
                                </li>
-                           )) : <p className="p-4 text-gray-500">Nenhum agendamento no histórico encontrado.</p>}
+                           )) : <p className="p-4 text-gray-500">Nenhum agendamento no histórico desta semana.</p>}
                         </ul>
                     </div>
                 </div>
@@ -1,14 +1,10 @@
 
-import React from 'react';
+import React, { useEffect, useState } from 'react';
 import { BarChart, Bar, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
-import { Client, Pet, Appointment } from '../types';
+import { DashboardSummary } from '../types';
 import { HomeIcon, UsersIcon, PawIcon, CalendarIcon } from './icons';
 
-interface DashboardProps {
-  clients: Client[];
-  pets: Pet[];
-  appointments: Appointment[];
-}
+const API_URL = '/api';
 
 const StatCard: React.FC<{ title: string; value: string | number; icon: React.ReactNode }> = ({ title, value, icon }) => (
   <div className="bg-white p-6 rounded-lg shadow-md flex items-center transition-transform hover:scale-105">
@@ -22,36 +18,37 @@ const StatCard: React.FC<{ title: string; value: string | number; icon: React.Re
   </div>
 );
 
-export const Dashboard: React.FC<DashboardProps> = ({ clients, appointments }) => {
-  const upcomingAppointments = appointments.filter(a => new Date(a.date) >= new Date()).length;
-  const totalPets = clients.reduce((acc, client) => acc + client.pets.length, 0);
+export const Dashboard: React.FC = () => {
+  const [summary, setSummary] = useState<DashboardSummary | null>(null);
 
-  const getWeeklyAppointmentData = () => {
-    const data: { name: string; agendamentos: number }[] = [];
-    const today = new Date();
-    for (let i = 0; i < 7; i++) {
-      const date = new Date(today);
-      date.setDate(today.getDate() + i);
-      const dayStr = date.toLocaleDateString('pt-BR', { weekday: 'short' });
-      const formattedDate = date.toISOString().split('T')[0];
-      
-      const count = appointments.filter(a => a.date.startsWith(formattedDate)).length;
-      data.push({ name: dayStr.charAt(0).toUpperCase() + dayStr.slice(1,3), agendamentos: count });
-    }
-    return data;
-  };
+  useEffect(() => {
+    const fetchSummary = async () => {
+      try {
+        const response = await fetch(`${API_URL}/dashboard/summary`);
+        if (response.ok) {
+          setSummary(await response.json());
+        }
+      } catch (error) {
+        console.error("Failed to fetch dashboard summary:", error);
+      }
+    };
+    fetchSummary();
+  }, []);
 
-  const weeklyData = getWeeklyAppointmentData();
+  const weeklyData = (summary?.weekly_appointments ?? []).map(({ date, count }) => {
+    const dayStr = new Date(`${date}T00:00`).toLocaleDateString('pt-BR', { weekday: 'short' });
+    return { name: dayStr.charAt(0).toUpperCase() + dayStr.slice(1,3), agendamentos: count };
+  });
 
   return (
     <div className="p-8 space-y-8">
       <h1 className="text-4xl font-bold text-gray-800">Dashboard</h1>
       
       <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-4 gap-6">
-        <StatCard title="Total de Clientes" value={clients.length} icon={<UsersIcon className="w-8 h-8 text-teal-600" />} />
-        <StatCard title="Total de Pets" value={totalPets} icon={<PawIcon className="w-8 h-8 text-teal-600" />} />
-        <StatCard title="Agendamentos Futuros" value={upcomingAppointments} icon={<CalendarIcon className="w-8 h-8 text-teal-600" />} />
-        <StatCard title="Consultas Hoje" value={weeklyData[0].agendamentos} icon={<HomeIcon className="w-8 h-8 text-teal-600" />} />
+        <StatCard title="Total de Clientes" value={summary?.total_clients ?? 0} icon={<UsersIcon className="w-8 h-8 text-teal-600" />} />
+        <StatCard title="Total de Pets" value={summary?.total_pets ?? 0} icon={<PawIcon className="w-8 h-8 text-teal-600" />} />
+        <StatCard title="Agendamentos Futuros" value={summary?.upcoming_appointments ?? 0} icon={<CalendarIcon className="w-8 h-8 text-teal-600" />} />
+        <StatCard title="Consultas Hoje" value={summary?.today_appointments ?? 0} icon={<HomeIcon className="w-8 h-8 text-teal-600" />} />
       </div>
 
       <div className="bg-white p-6 rounded-lg shadow-md">
@@ -1,6 +1,6 @@
 import React, { useState, useMemo, useEffect } from 'react';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
-import { Product, Service, Sale, SaleItem, Appointment } from '../types';
+import { Product, Service, Sale, SaleItem, Appointment, SalesReport, ReorderItem } from '../types';
 import { Modal } from './Modal';
 import { PlusIcon } from './icons';
 
@@ -81,8 +81,22 @@ export const Inventory: React.FC<InventoryProps> = (props) => {
 };
 
 const OverviewTab: React.FC<InventoryProps> = ({ products, sales }) => {
-    const lowStockCount = useMemo(() => products.filter(p => p.stock <= 5).length, [products]);
-    const totalRevenue = useMemo(() => sales.reduce((acc, sale) => acc + sale.total, 0), [sales]);
+    // Pushed by the server whenever a sale or stock change moves a product
+    // across its reorder point
+    const [reorderItems, setReorderItems] = useState<ReorderItem[]>([]);
+    useEffect(() => {
+        const events = new EventSource(`${API_URL}/inventory/reorder/events`);
+        events.addEventListener('reorder', e => setReorderItems(JSON.parse((e as MessageEvent).data)));
+        return () => events.close();
+    }, []);
+    // Summed on the server from the daily rollups, not from every sale here
+    const [totalRevenue, setTotalRevenue] = useState(0);
+    useEffect(() => {
+        fetch(`${API_URL}/inventory/sales/report`)
+            .then(response => response.ok ? response.json() : Promise.reject(response.status))
+            .then((report: SalesReport) => setTotalRevenue(report.revenue))
+            .catch(e => console.error('Failed to fetch sales report', e));
+    }, [sales]);
     const [loading, setLoading] = useState(false);
     const [error, setError] = useState<string | null>(null);
     const [forecastData, setForecastData] = useState<ForecastData[] | null>(null);
@@ -118,9 +132,24 @@ const OverviewTab: React.FC<InventoryProps> = ({ products, sales }) => {
         <div className="space-y-6">
             <div className="grid grid-cols-1 md:grid-cols-3 gap-6">
                 <StatCard title="Produtos em Estoque" value={products.length} />
-                <StatCard title="Itens com Baixo Estoque" value={lowStockCount} />
+                <StatCard title="Itens com Baixo Estoque" value={reorderItems.length} />
                 <StatCard title="Receita Total (Vendas)" value={totalRevenue.toLocaleString('pt-BR', { style: 'currency', currency: 'BRL' })} />
             </div>
+            {reorderItems.length > 0 && (
+                <div className="bg-white p-6 rounded-lg shadow-md">
+                    <h2 className="text-2xl font-semibold text-gray-700 mb-4">Reposição Necessária</h2>
+                    <ul className="divide-y divide-gray-200">
+                        {reorderItems.map(item => (
+                            <li key={item.product_id} className="py-2 flex justify-between">
+                                <span className="font-medium text-gray-800">{item.name}</span>
+                                <span className="text-gray-600">
+                                    Estoque: {item.stock} (ponto de pedido {item.reorder_point}) — sugerido: <strong>{item.suggested_quantity}</strong>
+                                </span>
+                            </li>
+                        ))}
+                    </ul>
+                </div>
+            )}
             <div className="bg-white p-6 rounded-lg shadow-md">
                 <h2 className="text-2xl font-semibold text-gray-700 mb-2">Previsão de Vendas e Sugestão de Estoque</h2>
                 <p className="text-gray-500 mb-4">Clique no botão para gerar uma previsão de vendas para os próximos 30 dias e receber sugestões de reabastecimento de estoque.</p>
@@ -488,18 +517,36 @@ const NewSaleTab: React.FC<InventoryProps> = ({ products, services, fetchData })
             date: new Date().toISOString(),
         };
         
-        const response = await fetch(`${API_URL}/inventory/sales`, {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify(saleData),
-        });
+        // One key per checkout: retries after a dropped connection get the
+        // original sale back instead of selling twice
+        const idempotencyKey = crypto.randomUUID();
+        // Network errors, 5xx and the "still in progress" 409 (sent with
+        // Retry-After) may succeed on retry; anything else, like not enough
+        // stock, is final
+        const retryable = (r: Response) => r.status >= 500 || (r.status === 409 && r.headers.has('Retry-After'));
+        let response: Response | null = null;
+        for (let attempt = 0; ; attempt++) {
+            try {
+                response = await fetch(`${API_URL}/inventory/sales`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKey },
+                    body: JSON.stringify(saleData),
+                });
+                if (!retryable(response)) break;
+            } catch (e) {
+                console.error(e);
+            }
+            if (attempt === 2) break;
+            await new Promise(resolve => setTimeout(resolve, 250 * 2 ** attempt));
+        }
         
-        if (response.ok) {
+        if (response?.ok) {
             setCart([]);
             await fetchData(); // Re-sync all data from the server
             alert('Venda finalizada com sucesso!');
         } else {
-            alert('Falha ao finalizar a venda.');
+            const detail = await response?.json().then(body => body.detail).catch(() => null);
+            alert(typeof detail === 'string' ? `Falha ao finalizar a venda: ${detail}` : 'Falha ao finalizar a venda.');
         }
     };
 
@@ -536,23 +583,25 @@ const SalesHistoryTab: React.FC<Omit<InventoryProps, 'setProducts' | 'setService
     const [currentPage, setCurrentPage] = useState(1);
     const [totalSales, setTotalSales] = useState(0);
     const [loading, setLoading] = useState(true);
+    // cursors[n] is the cursor that loads page n + 1; page 1 needs none
+    const [cursors, setCursors] = useState<(string | null)[]>([null]);
     const salesPerPage = 10;
 
     useEffect(() => {
         const fetchSales = async () => {
             setLoading(true);
             try {
-                const response = await fetch(`${API_URL}/inventory/sales?skip=${(currentPage - 1) * salesPerPage}&limit=${salesPerPage}`);
+                const cursor = cursors[currentPage - 1];
+                const response = await fetch(`${API_URL}/inventory/sales?limit=${salesPerPage}${cursor ? `&after=${encodeURIComponent(cursor)}` : ''}`);
                 if (!response.ok) {
                     throw new Error('Failed to fetch sales data');
                 }
                 const data = await response.json();
                 setSales(data);
-                // A resposta da API precisa incluir o total de vendas para a paginação funcionar
-                // Como a API atual não faz isso, vamos simular o total com base no comprimento da resposta
-                // O ideal é que a API retorne algo como { sales: [...], total: ... }
-                const total = response.headers.get('X-Total-Count');
-                setTotalSales(total ? parseInt(total, 10) : data.length < salesPerPage ? (currentPage - 1) * salesPerPage + data.length : currentPage * salesPerPage + 1);
+                // A API devolve o cursor da próxima página no cabeçalho X-Next-Cursor
+                const nextCursor = response.headers.get('X-Next-Cursor');
+                setCursors(prev => [...prev.slice(0, currentPage), nextCursor]);
+                setTotalSales(nextCursor ? currentPage * salesPerPage + 1 : (currentPage - 1) * salesPerPage + data.length);
 
             } catch (error) {
                 console.error(error);
@@ -62,6 +62,70 @@ export interface Sale {
   date: string; // ISO string
 }
 
+export interface SalesDay {
+  day: string; // YYYY-MM-DD, UTC
+  revenue: number;
+  units: number;
+  transactions: number;
+}
+
+export interface ProductSales {
+  product_id: number;
+  revenue: number;
+  units: number;
+  transactions: number;
+}
+
+export interface SalesReport {
+  revenue: number;
+  units: number;
+  transactions: number;
+  days: SalesDay[];
+  products: ProductSales[];
+}
+
+export interface ReorderItem {
+  product_id: number;
+  name: string;
+  stock: number;
+  reorder_point: number;
+  daily_velocity: number;
+  suggested_quantity: number;
+  updated_at: string;
+}
+
+export interface DailyCount {
+  date: string;
+  count: number;
+}
+
+export interface DashboardSummary {
+  total_clients: number;
+  total_pets: number;
+  upcoming_appointments: number;
+  today_appointments: number;
+  total_revenue: number;
+  low_stock_products: number;
+  weekly_appointments: { date: string; count: number }[];
+}
+
+export interface TableChanges<T> {
+  upserted: T[];
+  deleted: number[];
+}
+
+export interface SyncResponse {
+  version: number;
+  reset: boolean;
+  more: boolean;
+  clients: TableChanges<Client>;
+  pets: TableChanges<Pet>;
+  appointments: TableChanges<Appointment>;
+  products: TableChanges<Product>;
+  services: TableChanges<Service>;
+  sales: TableChanges<Sale>;
+}
+
 export enum Page {
   Dashboard = 'Dashboard',
   Clients = 'Clientes',